@@ -0,0 +1,79 @@
+"""
+Byte entropy of threat payloads. Single payloads are scored in plain
+Python; the (n, L) batch functions need NumPy, which is imported on their
+first call so the web process doesn't load it until a batch path runs.
+"""
+import math
+from collections import Counter
+
+def _as_matrix(payloads):
+    import numpy as np
+
+    payloads = np.asarray(payloads, dtype=np.uint8)
+    if payloads.ndim != 2:
+        raise ValueError("expected an (n, L) uint8 payload matrix")
+    return payloads
+
+def byte_histograms(payloads):
+    """Per-row byte counts of an (n, L) uint8 matrix as an (n, 256) array."""
+    import numpy as np
+
+    payloads = _as_matrix(payloads)
+    n = payloads.shape[0]
+    offsets = np.arange(n, dtype=np.int64)[:, None] << 8
+    flat = (payloads + offsets).ravel()
+    return np.bincount(flat, minlength=n << 8).reshape(n, 256)
+
+def _entropy_from_counts(counts, length):
+    # H = log2(L) - sum(c * log2(c)) / L; counts never exceed L, so c * log2(c)
+    # comes from a small lookup table instead of a log per bin
+    import numpy as np
+
+    c = np.arange(1, length + 1)
+    clog = np.concatenate(([0.0], c * np.log2(c)))
+    return np.log2(length) - clog[counts].sum(axis=-1) / length
+
+def max_entropy(length):
+    """Highest Shannon entropy (bits/byte) reachable by a payload of this length."""
+    return math.log2(min(length, 256)) if length > 1 else 1.0
+
+def _byte_counts(data):
+    # memoryview() takes any bytes-like payload and rejects everything else
+    raw = memoryview(data).tobytes()
+    return Counter(raw).values(), len(raw)
+
+def shannon_entropy(data):
+    """Shannon entropy of a bytes-like payload in bits per byte (0-8)."""
+    counts, length = _byte_counts(data)
+    if not length:
+        return 0.0
+    return math.log2(length) - sum(c * math.log2(c) for c in counts) / length
+
+def shannon_entropy_batch(payloads):
+    """Shannon entropy in bits per byte for every row of an (n, L) uint8 matrix."""
+    import numpy as np
+
+    payloads = _as_matrix(payloads)
+    if payloads.shape[1] == 0:
+        return np.zeros(payloads.shape[0])
+    return _entropy_from_counts(byte_histograms(payloads), payloads.shape[1])
+
+def entropy_score(data):
+    """Shannon entropy of a payload as a percentage of the maximum reachable for its length."""
+    return shannon_entropy(data) / max_entropy(len(data)) * 100
+
+def chi_square(data):
+    """Chi-square statistic of a bytes-like payload against a uniform byte distribution."""
+    counts, length = _byte_counts(data)
+    if not length:
+        return 0.0
+    expected = length / 256
+    # Bytes that never occur each contribute expected ** 2
+    unseen = 256 - len(counts)
+    return (sum((c - expected) ** 2 for c in counts) + unseen * expected * expected) / expected
+
+def chi_square_batch(payloads):
+    """Chi-square statistic against uniform for every row of an (n, L) uint8 matrix."""
+    payloads = _as_matrix(payloads)
+    expected = max(payloads.shape[1], 1) / 256
+    return ((byte_histograms(payloads) - expected) ** 2).sum(axis=1) / expected
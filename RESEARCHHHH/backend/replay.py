@@ -0,0 +1,178 @@
+"""
+Record a threat stream to a compact binary file and replay it into the forge.
+
+A recording is a short header followed by fixed-size threat records (see
+simulator.threat_dtype), so a replay memory-maps the file and compiles
+straight from it. With a seeded engine and a VirtualClock the same
+arguments always record the same stream, which makes timings from
+different builds comparable:
+
+    python -m src.replay record threats.bin --count 100000 --seed 1
+    python -m src.replay play threats.bin --speed max
+"""
+import argparse
+import os
+import struct
+import time
+
+import numpy as np
+
+from src.simulator import PAYLOAD_BYTES, threat_dtype
+from src.threat_engine import ThreatEngine, VirtualClock
+
+MAGIC = b'GGTR'
+VERSION = 1
+# magic, version, payload bytes per record
+HEADER = struct.Struct('<4sHH')
+
+# Records compiled per forge call during a replay
+REPLAY_BATCH = 1024
+
+# Virtual seconds between recorded threats, matching the live feed's rate
+RECORD_STEP = 0.9 / 0.8
+
+class ReplayFormatError(ValueError):
+    """The file is not a threat recording this version can read."""
+
+class ThreatRecorder:
+    """Appends threats to a new recording at path."""
+
+    def __init__(self, path, payload_bytes=PAYLOAD_BYTES):
+        self.dtype = threat_dtype(payload_bytes)
+        self.payload_bytes = payload_bytes
+        self.count = 0
+        self._type_codes = {t: i for i, t in enumerate(ThreatEngine.THREAT_TYPES)}
+        self._name_codes = {n: i for i, n in enumerate(ThreatEngine.CODENAMES)}
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, payload_bytes))
+
+    def write_batch(self, batch):
+        """Writes a spawn_batch() result (or a record array)."""
+        records = np.empty(len(batch["id"]), self.dtype)
+        for field in self.dtype.names:
+            records[field] = batch[field]
+        self.file.write(records.tobytes())
+        self.count += len(records)
+
+    def write(self, threats):
+        """Writes Threat records, e.g. from spawn_threat()."""
+        threats = list(threats)
+        records = np.empty(len(threats), self.dtype)
+        records["id"] = [int(t.id, 16) for t in threats]
+        records["name"] = [self._name_codes[t.name] for t in threats]
+        records["type"] = [self._type_codes[t.type] for t in threats]
+        records["score"] = [t.score for t in threats]
+        records["src"] = [t.src for t in threats]
+        records["entropy"] = [t.entropy for t in threats]
+        records["timestamp"] = [t.timestamp for t in threats]
+        payload = b"".join(t.payload for t in threats)
+        if len(payload) != len(threats) * self.payload_bytes:
+            raise ValueError(f"every payload must be {self.payload_bytes} bytes")
+        records["payload"] = np.frombuffer(payload, np.uint8).reshape(-1, self.payload_bytes)
+        self.file.write(records.tobytes())
+        self.count += len(records)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def record(path, count, seed=0, start=0.0, step=RECORD_STEP, chunk=REPLAY_BATCH):
+    """Records count threats from a seeded engine on a VirtualClock; returns the count written."""
+    engine = ThreatEngine(seed=seed, clock=VirtualClock(start, step))
+    with ThreatRecorder(path) as recorder:
+        while recorder.count < count:
+            n = min(chunk, count - recorder.count)
+            recorder.write(engine.spawn_threat() for _ in range(n))
+        return recorder.count
+
+class ThreatReplay:
+    """A memory-mapped recording; records is a read-only structured array."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ReplayFormatError(f"{path}: truncated header")
+        magic, version, payload_bytes = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ReplayFormatError(f"{path}: not a version {VERSION} threat recording")
+        self.dtype = threat_dtype(payload_bytes)
+        # A torn final record from an interrupted recording is ignored
+        count = (os.path.getsize(path) - HEADER.size) // self.dtype.itemsize
+        if count:
+            self.records = np.memmap(path, self.dtype, 'r', offset=HEADER.size, shape=(count,))
+        else:
+            self.records = np.empty(0, self.dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    def play(self, forge, speed=None, batch=REPLAY_BATCH):
+        """
+        Compiles the recording into forge and returns (threats, elapsed
+        seconds). speed=1 keeps the recorded spacing, speed=N plays N times
+        faster and speed=None as fast as the forge takes it.
+        """
+        records = self.records
+        total = len(records)
+        timestamps = records["timestamp"]
+        origin = timestamps[0] if total else 0.0
+        start = time.perf_counter()
+        i = 0
+        while i < total:
+            end = min(i + batch, total)
+            if speed is not None:
+                # Everything recorded up to the current virtual time is due
+                due = origin + (time.perf_counter() - start) * speed
+                end = min(end, int(np.searchsorted(timestamps, due, 'right')))
+                if end <= i:
+                    time.sleep((timestamps[i] - due) / speed)
+                    continue
+            forge.compile_batch(ThreatEngine.batch_to_threats(records[i:end]))
+            i = end
+        return total, time.perf_counter() - start
+
+def parse_speed(value):
+    """'max', 'N' or 'Nx' -> None or a float multiplier."""
+    if value == "max":
+        return None
+    speed = float(value.rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive")
+    return speed
+
+def main(argv=None):
+    from src.rule_forge import RuleForge
+
+    parser = argparse.ArgumentParser(description="Record or replay a deterministic threat stream.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rec = commands.add_parser("record", help="record a seeded threat stream")
+    rec.add_argument("path")
+    rec.add_argument("--count", type=int, default=100000)
+    rec.add_argument("--seed", type=int, default=0)
+    rec.add_argument("--step", type=float, default=RECORD_STEP,
+                     help="virtual seconds between threats")
+    play = commands.add_parser("play", help="replay a recording into a fresh in-memory forge")
+    play.add_argument("path")
+    play.add_argument("--speed", type=parse_speed, default=None,
+                      help="1x, Nx or max (default: max)")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        count = record(args.path, args.count, args.seed, step=args.step)
+        print(f"{count:,} threats recorded to {args.path}")
+        return
+
+    replay = ThreatReplay(args.path)
+    forge = RuleForge()
+    total, elapsed = replay.play(forge, args.speed)
+    print(f"{total:,} threats replayed in {elapsed:.2f}s "
+          f"({total / elapsed if elapsed else 0:,.0f}/s), {len(forge.rules_db):,} rules")
+
+if __name__ == "__main__":
+    main()
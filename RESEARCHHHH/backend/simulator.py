@@ -0,0 +1,232 @@
+"""
+Multi-process threat simulation.
+
+Threat generation is sharded across worker processes, each with its own
+numpy Generator seeded from one SeedSequence. Workers write fixed-size
+records into a per-worker shared-memory ring and the reading process
+builds threats from views of it, so neither a stress test nor the live
+feed (SIMULATOR_WORKERS, see src/pipeline.py) is capped by one core
+running spawn_threat().
+
+    python -m src.simulator --workers 4 --seconds 10
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.threat_engine import ThreatEngine
+
+PAYLOAD_BYTES = 32
+
+def threat_dtype(payload_bytes):
+    """
+    One spawned threat as a fixed-size little-endian record. Field names
+    match spawn_batch(), so record arrays feed batch_to_threats() directly.
+    """
+    return np.dtype([
+        ("id", "<u4"),
+        ("name", "u1"),
+        ("type", "u1"),
+        ("score", "u1"),
+        ("src", "<u4"),
+        ("entropy", "<f8"),
+        ("timestamp", "<f8"),
+        ("payload", "u1", (payload_bytes,)),
+    ])
+
+THREAT_DTYPE = threat_dtype(PAYLOAD_BYTES)
+
+# head and tail counters sit on their own cache lines ahead of the slots
+HEAD_AT = 0
+TAIL_AT = 64
+SLOTS_AT = 128
+
+# Records per ring and per worker batch
+RING_CAPACITY = 1 << 16
+WORKER_BATCH = 1024
+
+# Producer back-off while its ring is full
+FULL_BACKOFF = 0.0005
+
+class ThreatRing:
+    """
+    Single-producer, single-consumer ring of THREAT_DTYPE records in shared
+    memory. head and tail only ever grow; the producer alone advances head
+    and the consumer alone advances tail, so neither needs a lock. Slots
+    are written before head is stored, which readers rely on to never see
+    a half-written record.
+    """
+
+    def __init__(self, capacity=RING_CAPACITY, name=None):
+        create = name is None
+        size = SLOTS_AT + capacity * THREAT_DTYPE.itemsize
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.capacity = capacity
+        buf = self.shm.buf
+        self._head = np.ndarray((1,), np.uint64, buf, HEAD_AT)
+        self._tail = np.ndarray((1,), np.uint64, buf, TAIL_AT)
+        self.slots = np.ndarray((capacity,), THREAT_DTYPE, buf, SLOTS_AT)
+        if create:
+            self._head[0] = self._tail[0] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __len__(self):
+        return int(self._head[0] - self._tail[0])
+
+    def write(self, batch):
+        """
+        Producer side: copies as much of a spawn_batch() result as fits and
+        returns how many records were written.
+        """
+        head = int(self._head[0])
+        n = min(len(batch["id"]), self.capacity - (head - int(self._tail[0])))
+        written = 0
+        while written < n:
+            start = (head + written) % self.capacity
+            count = min(n - written, self.capacity - start)
+            dest = self.slots[start:start + count]
+            for field in THREAT_DTYPE.names:
+                dest[field] = batch[field][written:written + count]
+            written += count
+        self._head[0] = head + n
+        return n
+
+    def read(self, limit):
+        """
+        Consumer side: a view of up to limit unread records, without
+        copying. It stops at the end of the buffer, so a wrapped backlog
+        takes two reads. The records stay valid until consume().
+        """
+        tail = int(self._tail[0])
+        start = tail % self.capacity
+        count = min(limit, int(self._head[0]) - tail, self.capacity - start)
+        return self.slots[start:start + count]
+
+    def consume(self, n):
+        self._tail[0] += n
+
+    def close(self):
+        # Drop the views first; SharedMemory can't close while they hold its buffer
+        self._head = self._tail = self.slots = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+def _worker(ring_name, capacity, seed, batch_size, stop):
+    ring = ThreatRing(capacity, ring_name)
+    engine = ThreatEngine(rng=np.random.default_rng(seed))
+    try:
+        while not stop.is_set():
+            batch = engine.spawn_batch(batch_size, PAYLOAD_BYTES)
+            written = 0
+            while written < batch_size and not stop.is_set():
+                rest = batch if not written else {k: v[written:] for k, v in batch.items()}
+                n = ring.write(rest)
+                if not n:
+                    time.sleep(FULL_BACKOFF)
+                written += n
+    finally:
+        ring.close()
+
+class ThreatSimulator:
+    """
+    A pool of generator processes, one ring each.
+
+    Runs are reproducible per worker: worker i always draws from child i
+    of SeedSequence(seed). Interleaving across workers depends on
+    scheduling.
+    """
+
+    def __init__(self, workers=None, seed=None, capacity=RING_CAPACITY, batch_size=WORKER_BATCH):
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = np.random.SeedSequence(seed)
+        self.capacity = capacity
+        self.batch_size = min(batch_size, capacity)
+        self.rings = []
+        self.processes = []
+        self._stop = None
+
+    def start(self):
+        # Spawned, not forked: the server forks with threads running, and a lock
+        # one of them holds (the metrics registry's, say) would stay held in
+        # the child forever. Each worker builds its engine after it starts.
+        ctx = mp.get_context("spawn")
+        self._stop = ctx.Event()
+        for child_seed in self.seed.spawn(self.workers):
+            ring = ThreatRing(self.capacity)
+            process = ctx.Process(target=_worker, daemon=True,
+                                  args=(ring.name, self.capacity, child_seed, self.batch_size, self._stop))
+            process.start()
+            self.rings.append(ring)
+            self.processes.append(process)
+        return self
+
+    def drain(self, limit=WORKER_BATCH):
+        """
+        Yields zero-copy views of waiting records, up to limit per ring,
+        visiting each ring once. A view is released back to its producer
+        when the generator resumes, so finish with it (or copy it) first.
+        """
+        for ring in self.rings:
+            records = ring.read(limit)
+            if len(records):
+                yield records
+                ring.consume(len(records))
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for ring in self.rings:
+            ring.close()
+            ring.unlink()
+        self.rings, self.processes = [], []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def stress(forge, workers=None, seconds=10.0, seed=None):
+    """Compiles simulated traffic into forge for seconds; returns (threats compiled, elapsed)."""
+    compiled = 0
+    with ThreatSimulator(workers, seed) as sim:
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            idle = True
+            for records in sim.drain():
+                forge.compile_batch(ThreatEngine.batch_to_threats(records))
+                compiled += len(records)
+                idle = False
+            if idle:
+                time.sleep(FULL_BACKOFF)
+        return compiled, time.perf_counter() - start
+
+def main(argv=None):
+    from src.rule_forge import RuleForge
+
+    parser = argparse.ArgumentParser(description="Stress the rule forge with multi-process simulated traffic.")
+    parser.add_argument("--workers", type=int, default=None, help="generator processes (default: one per core)")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    forge = RuleForge()
+    compiled, elapsed = stress(forge, args.workers, args.seconds, args.seed)
+    print(f"{compiled:,} threats compiled in {elapsed:.1f}s "
+          f"({compiled / elapsed:,.0f}/s), {len(forge.rules_db):,} rules")
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,190 @@
-import random
-import uuid
-import time
-
-class ThreatEngine:
-    THREAT_TYPES = ['Virus', 'Phishing Link', 'Trojan', 'Ransomware', 'Malware', 'Spyware', 'Exploit']
-    CODENAMES = ['PAYLOAD', 'INJECT', 'CLICK_FRAUD', 'DROPBEAR', 'NIGHTCRAWL', 'SILENT_NOMAD', 'GOLDEN_EGG']
-
-    @staticmethod
-    def generate_ip():
-        """Generates a random internal or external IP address."""
-        return f"{random.randint(1, 255)}.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}"
-
-    @staticmethod
-    def generate_payload(length=32):
-        """Generates a random hex payload simulating a signature."""
-        return ' '.join([f"{random.randint(0, 255):02x}" for _ in range(length)])
-
-    def spawn_threat(self):
-        """Creates a threat object with scored heuristics."""
-        threat_id = str(uuid.uuid4())[:8].upper()
-        t_type = random.choice(self.THREAT_TYPES)
-        name = random.choice(self.CODENAMES)
-        
-        # Calculate heuristic score (simulated)
-        base_score = random.randint(10, 98)
-        
-        return {
-            "id": threat_id,
-            "name": name,
-            "type": t_type,
-            "score": base_score,
-            "src": self.generate_ip(),
-            "dst": "192.168.1.100",  # Protected Internal Node
-            "payload": self.generate_payload(),
-            "timestamp": time.time(),
-            "status": "active"
-        }
-
-    def analyze_entropy(self, payload):
-        """Mock analysis of payload entropy."""
-        unique_chars = len(set(payload))
-        return (unique_chars / len(payload)) * 100
\ No newline at end of file
+import random
+import time
+
+from src.cidr_table import int_to_ip
+from src.entropy import entropy_score, max_entropy, shannon_entropy_batch
+from src.metrics import SPAWN_BATCH_SECONDS, SPAWN_SECONDS, THREATS_SPAWNED, timed
+
+class Threat:
+    """A spawned threat. The source IP is a packed 32-bit integer and the payload raw bytes."""
+    __slots__ = ("id", "name", "type", "score", "src", "dst", "payload", "entropy", "timestamp", "status")
+
+    def __init__(self, id, name, type, score, src, dst, payload, entropy, timestamp, status="active"):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.score = score
+        self.src = src
+        self.dst = dst
+        self.payload = payload
+        self.entropy = entropy
+        self.timestamp = timestamp
+        self.status = status
+
+    def to_dict(self):
+        """Materializes the threat as a plain dict with a dotted source IP."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "type": self.type,
+            "score": self.score,
+            "src": int_to_ip(self.src),
+            "dst": self.dst,
+            "payload": self.payload,
+            "entropy": self.entropy,
+            "timestamp": self.timestamp,
+            "status": self.status
+        }
+
+class VirtualClock:
+    """
+    A clock for reproducible runs: each reading returns the current virtual
+    time and then moves it on by step seconds. advance() skips ahead.
+    """
+
+    def __init__(self, start=0.0, step=0.0):
+        self.now = start
+        self.step = step
+
+    def __call__(self):
+        now = self.now
+        self.now += self.step
+        return now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class ThreatEngine:
+    THREAT_TYPES = ['Virus', 'Phishing Link', 'Trojan', 'Ransomware', 'Malware', 'Spyware', 'Exploit']
+    CODENAMES = ['PAYLOAD', 'INJECT', 'CLICK_FRAUD', 'DROPBEAR', 'NIGHTCRAWL', 'SILENT_NOMAD', 'GOLDEN_EGG']
+    PROTECTED_NODE = "192.168.1.100"
+    # Entropy score (percent of the reachable maximum) that triggers auto-quarantine
+    QUARANTINE_ENTROPY = 90.0
+
+    def __init__(self, rng=None, seed=None, clock=None):
+        """
+        By default threats come from the global random module and the wall
+        clock. A seed makes spawn_threat() and spawn_batch() reproducible,
+        and a clock (e.g. a VirtualClock) replaces time.time() for their
+        timestamps. rng overrides the numpy Generator behind spawn_batch();
+        the default one is created, and NumPy imported, on first use.
+        """
+        self.random = random if seed is None else random.Random(seed)
+        self.seed = seed
+        self._rng = rng
+        self.clock = time.time if clock is None else clock
+
+    @property
+    def rng(self):
+        if self._rng is None:
+            import numpy as np
+
+            self._rng = np.random.default_rng(self.seed)
+        return self._rng
+
+    @staticmethod
+    def generate_ip():
+        """Generates a random internal or external IP address."""
+        return f"{random.randint(1, 255)}.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}"
+
+    @staticmethod
+    def generate_ip_int(source=random):
+        """generate_ip() as a packed 32-bit integer."""
+        return source.randint(1, 255) << 24 | source.getrandbits(16) << 8 | source.randint(1, 254)
+
+    @staticmethod
+    def generate_payload(length=32, source=random):
+        """Generates random payload bytes simulating a signature."""
+        return source.randbytes(length)
+
+    @timed(SPAWN_SECONDS)
+    def spawn_threat(self):
+        """Creates a threat object with scored heuristics."""
+        THREATS_SPAWNED.inc()
+        rand = self.random
+        threat_id = f"{rand.getrandbits(32):08X}"
+        t_type = rand.choice(self.THREAT_TYPES)
+        name = rand.choice(self.CODENAMES)
+        
+        # Calculate heuristic score (simulated)
+        base_score = rand.randint(10, 98)
+        payload = self.generate_payload(source=rand)
+
+        return Threat(
+            id=threat_id,
+            name=name,
+            type=t_type,
+            score=base_score,
+            src=self.generate_ip_int(rand),
+            dst=self.PROTECTED_NODE,  # Protected Internal Node
+            payload=payload,
+            entropy=round(self.analyze_entropy(payload), 1),
+            timestamp=self.clock()
+        )
+
+    @timed(SPAWN_BATCH_SECONDS)
+    def spawn_batch(self, n, payload_length=32):
+        """
+        Creates n threats at once as columnar NumPy arrays.
+
+        Types and codenames are index codes into THREAT_TYPES / CODENAMES,
+        source IPs are packed uint32 and payloads form an (n, payload_length)
+        uint8 matrix. Use batch_to_threats() to get Threat records.
+        """
+        import numpy as np
+
+        THREATS_SPAWNED.inc(n)
+        rng = self.rng
+        src = rng.integers(1, 256, n, dtype=np.uint32) << 24
+        src |= rng.integers(0, 1 << 16, n, dtype=np.uint32) << 8
+        src |= rng.integers(1, 255, n, dtype=np.uint32)
+        payload = rng.integers(0, 256, (n, payload_length), dtype=np.uint8)
+
+        return {
+            "id": rng.integers(0, 1 << 32, n, dtype=np.uint32),
+            "name": rng.integers(0, len(self.CODENAMES), n, dtype=np.uint8),
+            "type": rng.integers(0, len(self.THREAT_TYPES), n, dtype=np.uint8),
+            "score": rng.integers(10, 99, n, dtype=np.uint8),
+            "src": src,
+            "payload": payload,
+            "entropy": self.analyze_entropy_batch(payload),
+            "timestamp": np.full(n, self.clock()),
+        }
+
+    @classmethod
+    def batch_to_threats(cls, batch):
+        """Expands a spawn_batch() result into a list of Threat records."""
+        import numpy as np
+
+        names = np.array(cls.CODENAMES)[batch["name"]].tolist()
+        types = np.array(cls.THREAT_TYPES)[batch["type"]].tolist()
+        payload = batch["payload"]
+        width = payload.shape[1]
+        raw = payload.tobytes()
+        entropy = batch["entropy"].round(1).tolist()
+
+        threats = []
+        for i, (threat_id, score, src, ts) in enumerate(zip(batch["id"].tolist(),
+                                                            batch["score"].tolist(),
+                                                            batch["src"].tolist(),
+                                                            batch["timestamp"].tolist())):
+            threats.append(Threat(
+                f"{threat_id:08X}", names[i], types[i], score, src, cls.PROTECTED_NODE,
+                raw[i * width:(i + 1) * width], entropy[i], ts
+            ))
+        return threats
+
+    def analyze_entropy(self, payload):
+        """
+        Byte-level Shannon entropy of a payload as a percentage of the
+        maximum reachable for its length.
+        """
+        return entropy_score(payload)
+
+    def analyze_entropy_batch(self, payloads):
+        """analyze_entropy() over every row of an (n, L) uint8 payload matrix."""
+        return shannon_entropy_batch(payloads) / max_entropy(payloads.shape[1]) * 100
+
+    def should_quarantine(self, threat):
+        """Auto-quarantine decision for a spawned threat."""
+        return threat.entropy >= self.QUARANTINE_ENTROPY
\ No newline at end of file
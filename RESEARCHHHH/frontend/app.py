@@ -1,35 +1,243 @@
-from flask import Flask, render_template, jsonify
-from src.threat_engine import ThreatEngine
-from src.rule_forge import RuleForge
-
-app = Flask(__name__)
-engine = ThreatEngine()
-forge = RuleForge()
-
-@app.route('/')
-def index():
-    """Serves the Entropic Randomizer Dashboard"""
-    return render_template('index.html')
-
-@app.route('/forge')
-def filter_assembler():
-    """Serves the Filter Assembler Dashboard"""
-    return render_template('forge.html')
-
-# API Endpoint: Fetches a live threat from Python backend
-@app.route('/api/threat/spawn')
-def api_spawn():
-    threat = engine.spawn_threat()
-    return jsonify(threat)
-
-# API Endpoint: Compiles a rule from a threat
-@app.route('/api/rule/compile', methods=['POST'])
-def api_compile():
-    # In a real scenario, this would accept POST data
-    # For demo, we simulate a threat being passed in
-    dummy_threat = engine.spawn_threat()
-    rule = forge.compile_rule(dummy_threat)
-    return jsonify(rule)
-
-if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+import time
+
+from flask import Blueprint, Flask, Response, abort, current_app, g, jsonify, request
+from werkzeug.local import LocalProxy
+
+from src.assets import STATIC_DIR, TEMPLATE_DIR, AssetStore, compress_body, etag_matches
+from src.event_hub import sse_frame, stream_cursor
+from src.ingest import NDJSON_TYPES, ThreatValidationError, iter_ndjson, parse_threats
+from src.metrics import (PROMETHEUS_CONTENT_TYPE, REGISTRY, SERIALIZE_SECONDS,
+                         observe_request)
+from src.pipeline import (Pipeline, batch_json, threat_json, ANALYZE_LIMIT, JSON_GZIP_LEVEL,
+                          JSON_GZIP_MIN_BYTES, MAX_ANALYZE_LIMIT, STATS_HEAT_ROWS, STREAM_KEEPALIVE,
+                          STREAM_MAX_EVENTS, STREAM_QUEUE, STREAM_WINDOW,
+                          stream_window)
+
+dashboard = Blueprint('dashboard', __name__)
+# The pipeline of the app handling the current request
+pipeline = LocalProxy(lambda: current_app.extensions['pipeline'])
+
+def create_app(pipeline=None):
+    """
+    Builds the dashboard app around pipeline, a fresh Pipeline by default.
+    Nothing is started here: the threat feed and quarantine workers start
+    with the first /api/stream client, and NumPy is only imported once a
+    batch endpoint needs it, so the app is up as soon as Flask is.
+    """
+    # The dashboards are served from the asset build (see src/assets.py)
+    app = Flask(__name__, static_folder=None)
+    app.extensions['pipeline'] = Pipeline() if pipeline is None else pipeline
+    app.extensions['assets'] = AssetStore(STATIC_DIR, TEMPLATE_DIR)
+    app.register_blueprint(dashboard)
+    return app
+
+@dashboard.before_app_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@dashboard.after_app_request
+def record_request(response):
+    # Streamed responses are timed to their first byte
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    observe_request(route, response.status_code, time.perf_counter() - g.request_start)
+    return response
+
+@dashboard.after_app_request
+def compress_json(response):
+    if response.mimetype != 'application/json' or response.is_streamed or 'Content-Encoding' in response.headers:
+        return response
+    body, coding = compress_body(response.get_data(), request.headers.get('Accept-Encoding'),
+                                 JSON_GZIP_MIN_BYTES, JSON_GZIP_LEVEL)
+    response.vary.add('Accept-Encoding')
+    if coding:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = coding
+    return response
+
+def send_asset(name):
+    """
+    Sends a built page or asset in the best encoding the client accepts,
+    or 304 if it already holds that variant.
+    """
+    asset = current_app.extensions['assets'].get(name)
+    if asset is None:
+        abort(404)
+    coding, body, etag = asset.select(request.headers.get('Accept-Encoding'))
+    headers = {"ETag": etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        return Response(status=304, headers=headers)
+    if coding:
+        headers["Content-Encoding"] = coding
+    return Response(body, content_type=asset.content_type, headers=headers)
+
+@dashboard.route('/')
+def index():
+    """Serves the Entropic Randomizer Dashboard"""
+    return send_asset('index.html')
+
+@dashboard.route('/forge')
+def filter_assembler():
+    """Serves the Filter Assembler Dashboard"""
+    return send_asset('forge.html')
+
+# Minified, fingerprinted stylesheets and scripts linked by the dashboards
+@dashboard.route('/assets/<name>')
+def asset(name):
+    return send_asset(name)
+
+# API Endpoint: Fetches a live threat from Python backend
+# Pass ?count=N (at least 1) to spawn a batch of N threats in one call
+@dashboard.route('/api/threat/spawn')
+def api_spawn():
+    count = request.args.get('count', type=int)
+    if count is None:
+        threat = pipeline.spawn()
+        with SERIALIZE_SECONDS.time():
+            return jsonify(threat_json(threat))
+
+    try:
+        batch = pipeline.spawn_batch(count)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    with SERIALIZE_SECONDS.time():
+        return jsonify(batch_json(batch))
+
+# API Endpoint: Compiles rules from posted threats
+# Body: one threat object, a JSON array of threats, or NDJSON. A single
+# threat returns its rule; a batch returns {"rule_ids": [...]}, or streams
+# NDJSON {"rule_id": ...} lines as they are compiled with ?stream=1.
+# An empty body compiles a simulated threat, as the dashboards do.
+@dashboard.route('/api/rule/compile', methods=['POST'])
+def api_compile():
+    stream = request.args.get('stream', type=int)
+    if stream and request.mimetype in NDJSON_TYPES:
+        return Response(pipeline.compile_stream(iter_ndjson(request.stream)),
+                        mimetype='application/x-ndjson')
+
+    body = request.get_data()
+    if not body.strip():
+        dummy_threat = pipeline.engine.spawn_threat()
+        rule = pipeline.compile(dummy_threat)
+        with SERIALIZE_SECONDS.time():
+            return jsonify(rule.to_dict())
+
+    try:
+        threats, bulk = parse_threats(body, request.content_type)
+    except ThreatValidationError as e:
+        return jsonify({"error": str(e), "index": e.index}), 400
+
+    if not bulk:
+        rule = pipeline.compile(threats[0])
+        with SERIALIZE_SECONDS.time():
+            return jsonify(rule.to_dict())
+    if stream:
+        return Response(pipeline.compile_stream(threats), mimetype='application/x-ndjson')
+    rules = pipeline.compile_batch(threats)
+    with SERIALIZE_SECONDS.time():
+        return jsonify({"rule_ids": [rule.rule_id for rule in rules]})
+
+# API Endpoint: Pre-binned chart data for the dashboards (kills per type,
+# kill/collection timeline and the ?rows=N busiest source /16 heat rows)
+@dashboard.route('/api/stats')
+def api_stats():
+    rows = request.args.get('rows', STATS_HEAT_ROWS, type=int)
+    with SERIALIZE_SECONDS.time():
+        return jsonify(pipeline.stats.snapshot(max(0, min(rows, 64))))
+
+# API Endpoint: Quarantine queue depth, kill counts and dwell times, with the
+# ?top=N highest-risk threats still queued
+@dashboard.route('/api/quarantine')
+def api_quarantine():
+    top = request.args.get('top', 0, type=int)
+    with SERIALIZE_SECONDS.time():
+        return jsonify(pipeline.quarantine_status(top))
+
+# API Endpoint: Re-scores a quarantined threat or sets its status
+# Body: {"id": ..., "score": 0-100, "status": "active" | "killed" | "released"}
+# "killed" neutralizes it now, "released" drops it without compiling a rule
+@dashboard.route('/api/quarantine', methods=['POST'])
+def api_quarantine_update():
+    try:
+        threat = pipeline.update_quarantine(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if threat is None:
+        return jsonify({"error": "threat is not quarantined"}), 404
+    with SERIALIZE_SECONDS.time():
+        return jsonify(threat_json(threat))
+
+# API Endpoint: Streams the rule fabric as NDJSON (default) or ?format=json
+# Filters: ?type=, ?min_priority=, ?max_priority=, ?since=<unix time>, and
+# ?minimize=1 to leave out shadowed and redundant rules
+# Paging: ?limit=N ends the export with a next_cursor; pass it back as ?cursor=
+@dashboard.route('/api/rules/export')
+def api_export():
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'json'):
+        return jsonify({"error": "format must be ndjson or json"}), 400
+    try:
+        chunks = pipeline.export_rules(
+            fmt,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', type=int),
+            type=request.args.get('type'),
+            min_priority=request.args.get('min_priority', type=int),
+            max_priority=request.args.get('max_priority', type=int),
+            since=request.args.get('since', type=float),
+            minimize=bool(request.args.get('minimize', type=int))
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    headers = {}
+    if request.args.get('download'):
+        headers["Content-Disposition"] = f'attachment; filename="auto_rules.{fmt}"'
+    mimetype = 'application/json' if fmt == 'json' else 'application/x-ndjson'
+    return Response(chunks, mimetype=mimetype, headers=headers)
+
+# API Endpoint: Shadowed, redundant and overlapping rules in the fabric,
+# with counts and up to ?limit=N findings
+@dashboard.route('/api/rules/analyze')
+def api_analyze():
+    limit = request.args.get('limit', ANALYZE_LIMIT, type=int)
+    with SERIALIZE_SECONDS.time():
+        return jsonify(pipeline.forge.analyze(max(0, min(limit, MAX_ANALYZE_LIMIT))))
+
+# API Endpoint: Server-sent event stream of new threats and compiled rules
+# Events are coalesced into "batch" frames every ?window=ms (default 100,
+# 10 to 5000).
+# Frame ids are event sequence numbers: a reconnect (Last-Event-ID) or
+# ?since=N first gets the retained events after N, so clients only fetch deltas.
+@dashboard.route('/api/stream')
+def api_stream():
+    window = stream_window(request.args.get('window', STREAM_WINDOW * 1000, type=float))
+    limit = max(1, min(request.args.get('max', STREAM_MAX_EVENTS, type=int), STREAM_MAX_EVENTS))
+    pipeline.start_threat_feed()
+    hub = pipeline.hub
+    since = stream_cursor(request.headers.get('Last-Event-ID'), request.args.get('since'))
+    sub = hub.subscribe(STREAM_QUEUE, since)
+
+    def frames():
+        try:
+            yield "retry: 2000\n\n"
+            while True:
+                if not hub.wait(sub, STREAM_KEEPALIVE):
+                    yield ": keepalive\n\n"
+                    continue
+                time.sleep(window)
+                events, dropped = sub.drain(limit)
+                yield sse_frame(events, dropped)
+        finally:
+            hub.unsubscribe(sub)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(frames(), mimetype='text/event-stream', headers=headers)
+
+# Prometheus scrape target: spawn/compile counters, rule counts and
+# per-stage and per-route latency histograms. METRICS=0 turns sampling off.
+@dashboard.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+if __name__ == '__main__':
+    create_app().run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,399 @@
+"""
+ASGI serving mode for the dashboard API.
+
+Run with an ASGI server, e.g. ``uvicorn asgi:app --workers 1``. Handlers are
+coroutines on a single event loop, so a streaming dashboard costs one
+suspended coroutine instead of a thread. Rule state lives in this process;
+see the README for the worker model.
+"""
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs
+
+from src.assets import (ASSET_PREFIX, STATIC_DIR, TEMPLATE_DIR, AssetStore, accepted_encodings,
+                        compress_body, etag_matches)
+from src.event_hub import sse_frame, stream_cursor
+from src.ingest import NDJSON_TYPES, ThreatValidationError, iter_ndjson, parse_threats
+from src.metrics import (PROMETHEUS_CONTENT_TYPE, REGISTRY, SERIALIZE_SECONDS,
+                         observe_request)
+from src.pipeline import (FEED_INTERVAL, Pipeline, batch_json, threat_json, ANALYZE_LIMIT, JSON_GZIP_LEVEL,
+                          JSON_GZIP_MIN_BYTES, MAX_ANALYZE_LIMIT, SIMULATOR_WORKERS, STATS_HEAT_ROWS,
+                          STREAM_KEEPALIVE, STREAM_MAX_EVENTS, STREAM_QUEUE, STREAM_WINDOW,
+                          stream_window)
+
+pipeline = Pipeline()
+assets = AssetStore(STATIC_DIR, TEMPLATE_DIR)
+
+async def send_body(send, status, body, content_type, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()),
+                    (b"content-length", str(len(body)).encode()), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def send_json(send, data, status=200):
+    with SERIALIZE_SECONDS.time():
+        body = json.dumps(data).encode()
+    await send_body(send, status, body, "application/json")
+
+def query_param(scope, name, default=None, type=str):
+    values = parse_qs(scope["query_string"].decode()).get(name)
+    if not values:
+        return default
+    try:
+        return type(values[0])
+    except ValueError:
+        return default
+
+def header(scope, name):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+def body_lines(receive, loop):
+    """
+    Yields the lines of a request body as its chunks arrive. Meant for a
+    worker thread: each chunk is received on the event loop.
+    """
+    pending = b""
+    more = True
+    while more:
+        message = asyncio.run_coroutine_threadsafe(receive(), loop).result()
+        more = message.get("more_body", False)
+        *lines, pending = (pending + message.get("body", b"")).split(b"\n")
+        yield from lines
+    if pending:
+        yield pending
+
+async def index(scope, receive, send):
+    await send_asset(scope, send, 'index.html')
+
+async def filter_assembler(scope, receive, send):
+    await send_asset(scope, send, 'forge.html')
+
+async def static_asset(scope, receive, send):
+    await send_asset(scope, send, scope["path"][len(ASSET_PREFIX):])
+
+async def send_asset(scope, send, name):
+    """
+    Sends a built page or asset in the best encoding the client accepts,
+    or 304 if it already holds that variant.
+    """
+    asset = assets.get(name)
+    if asset is None:
+        await send_json(send, {"error": "not found"}, status=404)
+        return
+    coding, body, etag = asset.select(header(scope, b"accept-encoding"))
+    headers = [(b"etag", etag.encode()), (b"cache-control", asset.cache_control.encode()),
+               (b"vary", b"accept-encoding")]
+    if etag_matches(header(scope, b"if-none-match"), etag):
+        await send({"type": "http.response.start", "status": 304, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    if coding:
+        headers.append((b"content-encoding", coding.encode()))
+    await send_body(send, 200, body, asset.content_type, headers)
+
+def compressing(scope, send):
+    """
+    Wraps send so that JSON responses sent in one body message are gzipped
+    for clients that accept it. Streamed responses pass through untouched.
+    """
+    accept = header(scope, b"accept-encoding")
+    if "gzip" not in accepted_encodings(accept):
+        return send
+    held = None
+
+    async def send_compressed(message):
+        nonlocal held
+        if message["type"] == "http.response.start":
+            if dict(message["headers"]).get(b"content-type", b"").startswith(b"application/json"):
+                held = message
+                return
+        elif held is not None:
+            start, held = held, None
+            if not message.get("more_body"):
+                body, coding = compress_body(message.get("body", b""), accept,
+                                             JSON_GZIP_MIN_BYTES, JSON_GZIP_LEVEL)
+                headers = [(b"vary", b"accept-encoding")]
+                if coding:
+                    headers += [(b"content-encoding", coding.encode()),
+                                (b"content-length", str(len(body)).encode())]
+                    message = {**message, "body": body}
+                kept = [(k, v) for k, v in start["headers"] if not (coding and k == b"content-length")]
+                start = {**start, "headers": kept + headers}
+            await send(start)
+        await send(message)
+
+    return send_compressed
+
+# Anything that takes the forge lock or does real CPU work runs on the
+# default thread pool: the quarantine workers hold the same lock, and a bulk
+# compile or analysis on the loop would stall every other client with it.
+
+async def in_thread(iterator):
+    """Yields from a blocking iterator, advancing it on the thread pool."""
+    iterator = iter(iterator)
+    done = object()
+    while True:
+        item = await asyncio.to_thread(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+async def api_spawn(scope, receive, send):
+    count = query_param(scope, "count", type=int)
+    if count is None:
+        await send_json(send, threat_json(await asyncio.to_thread(pipeline.spawn)))
+    else:
+        try:
+            batch = await asyncio.to_thread(pipeline.spawn_batch, count)
+        except ValueError as e:
+            await send_json(send, {"error": str(e)}, status=400)
+            return
+        await send_json(send, await asyncio.to_thread(batch_json, batch))
+
+async def send_ndjson(send, lines):
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/x-ndjson")],
+    })
+    async for line in in_thread(lines):
+        await send({"type": "http.response.body", "body": line.encode(), "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+async def api_compile(scope, receive, send):
+    stream = query_param(scope, "stream", type=int)
+    content_type = header(scope, b"content-type")
+    if stream and content_type and content_type.split(';')[0].strip() in NDJSON_TYPES:
+        # Compiled as the lines arrive, as under Flask: a bad line ends the
+        # stream with an error line after the rules compiled before it
+        lines = body_lines(receive, asyncio.get_running_loop())
+        await send_ndjson(send, pipeline.compile_stream(iter_ndjson(lines)))
+        return
+
+    body = await read_body(receive)
+    if not body.strip():
+        # No detection posted: compile a simulated one, as the dashboards do
+        dummy_threat = pipeline.engine.spawn_threat()
+        rule = await asyncio.to_thread(pipeline.compile, dummy_threat)
+        await send_json(send, rule.to_dict())
+        return
+
+    try:
+        threats, bulk = await asyncio.to_thread(parse_threats, body, content_type)
+    except ThreatValidationError as e:
+        await send_json(send, {"error": str(e), "index": e.index}, status=400)
+        return
+
+    if not bulk:
+        rule = await asyncio.to_thread(pipeline.compile, threats[0])
+        await send_json(send, rule.to_dict())
+    elif stream:
+        await send_ndjson(send, pipeline.compile_stream(threats))
+    else:
+        rules = await asyncio.to_thread(pipeline.compile_batch, threats)
+        await send_json(send, {"rule_ids": [rule.rule_id for rule in rules]})
+
+async def api_stats(scope, receive, send):
+    rows = query_param(scope, "rows", STATS_HEAT_ROWS, type=int)
+    await send_json(send, await asyncio.to_thread(pipeline.stats.snapshot, max(0, min(rows, 64))))
+
+async def api_quarantine(scope, receive, send):
+    top = query_param(scope, "top", 0, type=int)
+    await send_json(send, await asyncio.to_thread(pipeline.quarantine_status, top))
+
+async def api_quarantine_update(scope, receive, send):
+    try:
+        update = json.loads(await read_body(receive))
+        threat = await asyncio.to_thread(pipeline.update_quarantine, update)
+    except ValueError as e:
+        await send_json(send, {"error": str(e)}, status=400)
+        return
+    if threat is None:
+        await send_json(send, {"error": "threat is not quarantined"}, status=404)
+        return
+    await send_json(send, threat_json(threat))
+
+async def api_export(scope, receive, send):
+    fmt = query_param(scope, "format", "ndjson")
+    if fmt not in ("ndjson", "json"):
+        await send_json(send, {"error": "format must be ndjson or json"}, status=400)
+        return
+    try:
+        chunks = pipeline.export_rules(
+            fmt,
+            cursor=query_param(scope, "cursor"),
+            limit=query_param(scope, "limit", type=int),
+            type=query_param(scope, "type"),
+            min_priority=query_param(scope, "min_priority", type=int),
+            max_priority=query_param(scope, "max_priority", type=int),
+            since=query_param(scope, "since", type=float),
+            minimize=bool(query_param(scope, "minimize", type=int))
+        )
+    except ValueError as e:
+        await send_json(send, {"error": str(e)}, status=400)
+        return
+
+    content_type = b"application/json" if fmt == "json" else b"application/x-ndjson"
+    headers = [(b"content-type", content_type)]
+    if query_param(scope, "download"):
+        headers.append((b"content-disposition", f'attachment; filename="auto_rules.{fmt}"'.encode()))
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    async for chunk in in_thread(chunks):
+        await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+async def api_analyze(scope, receive, send):
+    limit = query_param(scope, "limit", ANALYZE_LIMIT, type=int)
+    report = await asyncio.to_thread(pipeline.forge.analyze, max(0, min(limit, MAX_ANALYZE_LIMIT)))
+    await send_json(send, report)
+
+async def api_stream(scope, receive, send):
+    window = stream_window(query_param(scope, "window", STREAM_WINDOW * 1000, type=float))
+    limit = max(1, min(query_param(scope, "max", STREAM_MAX_EVENTS, type=int), STREAM_MAX_EVENTS))
+    hub = pipeline.hub
+    since = stream_cursor(header(scope, b"last-event-id"), query_param(scope, "since"))
+    # Publishers run on other threads; they wake this client through the loop
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    sub = hub.subscribe(STREAM_QUEUE, since, notify=lambda: loop.call_soon_threadsafe(wake.set))
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        disconnected.set()
+        wake.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream"),
+                        (b"cache-control", b"no-cache"),
+                        (b"x-accel-buffering", b"no")],
+        })
+        await send({"type": "http.response.body", "body": b"retry: 2000\n\n", "more_body": True})
+
+        while not disconnected.is_set():
+            if not sub.queue:
+                # Cleared before the re-check, so an event published in
+                # between still leaves wake set
+                wake.clear()
+                if not sub.queue:
+                    try:
+                        await asyncio.wait_for(wake.wait(), STREAM_KEEPALIVE)
+                    except asyncio.TimeoutError:
+                        await send({"type": "http.response.body", "body": b": keepalive\n\n", "more_body": True})
+                    continue
+            # The window is the coalescing delay once something has arrived
+            await asyncio.sleep(window)
+            events, dropped = sub.drain(limit)
+            frame = sse_frame(events, dropped)
+            await send({"type": "http.response.body", "body": frame.encode(), "more_body": True})
+    finally:
+        watcher.cancel()
+        hub.unsubscribe(sub)
+
+async def metrics(scope, receive, send):
+    await send_body(send, 200, REGISTRY.render().encode(), PROMETHEUS_CONTENT_TYPE)
+
+async def threat_feed():
+    while True:
+        await asyncio.sleep(FEED_INTERVAL)
+        await asyncio.to_thread(pipeline.feed_tick)
+
+ROUTES = {
+    ("GET", "/"): index,
+    ("GET", "/forge"): filter_assembler,
+    ("GET", "/api/threat/spawn"): api_spawn,
+    ("POST", "/api/rule/compile"): api_compile,
+    ("GET", "/api/rules/export"): api_export,
+    ("GET", "/api/rules/analyze"): api_analyze,
+    ("GET", "/api/stats"): api_stats,
+    ("GET", "/api/quarantine"): api_quarantine,
+    ("POST", "/api/quarantine"): api_quarantine_update,
+    ("GET", "/api/stream"): api_stream,
+    ("GET", "/metrics"): metrics,
+}
+
+async def lifespan(receive, send):
+    feed = None
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            if SIMULATOR_WORKERS > 0:
+                # The simulator rings are drained by the pipeline's feed thread
+                pipeline.start_threat_feed()
+            else:
+                feed = asyncio.create_task(threat_feed())
+                pipeline.quarantine.start()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if feed is not None:
+                feed.cancel()
+            await asyncio.to_thread(pipeline.stop_threat_feed)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+    send = compressing(scope, send)
+
+    if not REGISTRY.enabled:
+        await dispatch(scope, receive, send)
+        return
+
+    start = time.perf_counter()
+    status = 500
+
+    async def send_recorded(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        await send(message)
+
+    try:
+        await dispatch(scope, receive, send_recorded)
+    finally:
+        route = route_name(scope["path"])
+        observe_request(route, status, time.perf_counter() - start)
+
+def route_name(path):
+    if any(route == path for _, route in ROUTES):
+        return path
+    if path.startswith(ASSET_PREFIX):
+        return ASSET_PREFIX + "<name>"
+    return "unmatched"
+
+async def dispatch(scope, receive, send):
+    handler = ROUTES.get((scope["method"], scope["path"]))
+    if handler is None and scope["method"] == "GET" and scope["path"].startswith(ASSET_PREFIX):
+        handler = static_asset
+    if handler is None:
+        if any(path == scope["path"] for _, path in ROUTES):
+            await send_json(send, {"error": "method not allowed"}, status=405)
+        else:
+            await send_json(send, {"error": "not found"}, status=404)
+        return
+    await handler(scope, receive, send)
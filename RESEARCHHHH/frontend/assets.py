@@ -0,0 +1,284 @@
+"""
+Build-time asset pipeline for the dashboards.
+
+Each page's inline <style> and <script> is minified and moved into a file
+named after its content hash (index.3f9a0c1d2e4b.js), leaving a small HTML
+shell that links to them. Every file is stored with a gzip variant and, when
+the brotli package is installed, a brotli one, so serving a page is a dict
+lookup and nothing is compressed per request:
+
+    python -m src.assets src/templates src/static
+
+Fingerprinted files never change under the same name and are served as
+immutable; the shells keep their URLs and are revalidated by strong ETag.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# The pages and their build ship inside the package, so an installed copy serves
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_DIR = os.path.join(PACKAGE_DIR, "templates")
+STATIC_DIR = os.path.join(PACKAGE_DIR, "static")
+
+PAGES = ("index.html", "forge.html")
+MANIFEST = "manifest.json"
+ASSET_PREFIX = "/assets/"
+
+# Hex digits of the content hash kept in fingerprinted names and ETags
+FINGERPRINT_CHARS = 12
+
+# Content codings in order of preference, with the suffix of their stored variant
+CODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+}
+
+# Inline blocks without attributes; <script src=...> and the like are left alone
+_INLINE = re.compile(r"<(style|script)>(.*?)</\1>", re.S)
+
+def minify_js(source):
+    """
+    Drops indentation, blank lines and whole-line // comments. Line breaks
+    are kept, so automatic semicolon insertion sees the same code, and lines
+    inside a multi-line template literal or continued string stay as they are.
+    """
+    lines = []
+    in_template = False
+    verbatim = False
+    for line in source.splitlines():
+        text = line if verbatim else line.lstrip()
+        if not verbatim and (not text or text.startswith("//")):
+            continue
+        if (line.count("`") - line.count("\\`")) % 2:
+            in_template = not in_template
+        # The next line continues a literal, so neither end may be trimmed
+        verbatim = in_template or line.endswith("\\")
+        lines.append(text if verbatim else text.rstrip())
+    return "\n".join(lines)
+
+def minify_css(source):
+    """Drops comments and the whitespace around braces, semicolons and commas."""
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.S)
+    source = re.sub(r"\s+", " ", source)
+    return re.sub(r" ?([{};,]) ?", r"\1", source).strip()
+
+def minify_html(source):
+    """Drops indentation and blank lines, except inside <pre> and <textarea>."""
+    lines = []
+    closing = None
+    for line in source.splitlines():
+        if closing is not None:
+            lines.append(line)
+            if closing in line:
+                closing = None
+            continue
+        text = line.strip()
+        if text:
+            lines.append(text)
+        for tag in ("pre", "textarea"):
+            at = text.rfind(f"<{tag}")
+            if at != -1 and f"</{tag}>" not in text[at:]:
+                closing = f"</{tag}>"
+    return "\n".join(lines)
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:FINGERPRINT_CHARS]
+
+def compressed_variants(data):
+    """coding -> compressed bytes, for each coding that makes data smaller."""
+    variants = {"gzip": gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    return {coding: body for coding, body in variants.items() if len(body) < len(data)}
+
+def build_assets(pages):
+    """
+    pages maps page names (index.html) to their HTML. Returns file name ->
+    bytes for every shell, fingerprinted asset and compressed variant, plus
+    the manifest describing them.
+    """
+    files = {}
+    manifest = {}
+
+    def add(name, data, immutable):
+        variants = compressed_variants(data)
+        manifest[name] = {"etag": fingerprint(data), "immutable": immutable,
+                          "encodings": sorted(variants)}
+        files[name] = data
+        for coding, suffix in CODINGS:
+            if coding in variants:
+                files[name + suffix] = variants[coding]
+
+    for page, html in pages.items():
+        stem = os.path.splitext(page)[0]
+
+        def extract(match):
+            kind, body = match.groups()
+            if kind == "style":
+                data = minify_css(body).encode("utf-8")
+                name = f"{stem}.{fingerprint(data)}.css"
+                tag = f'<link rel="stylesheet" href="{ASSET_PREFIX}{name}">'
+            else:
+                data = minify_js(body).encode("utf-8")
+                name = f"{stem}.{fingerprint(data)}.js"
+                tag = f'<script src="{ASSET_PREFIX}{name}"></script>'
+            add(name, data, True)
+            return tag
+
+        add(page, minify_html(_INLINE.sub(extract, html)).encode("utf-8"), False)
+
+    files[MANIFEST] = json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8")
+    return files
+
+def read_pages(template_dir):
+    pages = {}
+    for page in PAGES:
+        with open(os.path.join(template_dir, page), encoding="utf-8") as f:
+            pages[page] = f.read()
+    return pages
+
+def write_assets(files, static_dir):
+    os.makedirs(static_dir, exist_ok=True)
+    for name, data in files.items():
+        with open(os.path.join(static_dir, name), "wb") as f:
+            f.write(data)
+
+@lru_cache(maxsize=256)
+def accepted_encodings(header):
+    """The content codings an Accept-Encoding header allows (q > 0)."""
+    accepted, refused = set(), set()
+    for item in (header or "").split(","):
+        coding, *params = item.split(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            (accepted if q > 0 else refused).add(coding)
+    if "*" in accepted:
+        accepted.update(coding for coding, _ in CODINGS if coding not in refused)
+    return frozenset(accepted)
+
+def etag_matches(header, etag):
+    """True if an If-None-Match header lists etag or is *."""
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+def compress_body(body, accept_encoding, min_bytes, level):
+    """
+    Gzips a response body for a client that accepts it. Returns (body,
+    coding), with coding None when the body is sent as it is: too small to
+    be worth it, or not accepted.
+    """
+    if len(body) < min_bytes or "gzip" not in accepted_encodings(accept_encoding):
+        return body, None
+    return gzip.compress(body, level, mtime=0), "gzip"
+
+class Asset:
+    """A built file: its bytes per content coding (None for identity) and caching headers."""
+
+    __slots__ = ("name", "etag", "content_type", "cache_control", "bodies")
+
+    def __init__(self, name, etag, immutable, bodies):
+        self.name = name
+        self.etag = etag
+        self.content_type = CONTENT_TYPES.get(os.path.splitext(name)[1], "application/octet-stream")
+        self.cache_control = IMMUTABLE if immutable else REVALIDATE
+        self.bodies = bodies
+
+    def select(self, accept_encoding):
+        """
+        (coding, body, etag) of the best variant for an Accept-Encoding
+        header. Each variant has its own strong ETag, as their bytes differ.
+        """
+        accepted = accepted_encodings(accept_encoding)
+        for coding, _ in CODINGS:
+            if coding in self.bodies and coding in accepted:
+                return coding, self.bodies[coding], f'"{self.etag}-{coding}"'
+        return None, self.bodies[None], f'"{self.etag}"'
+
+class AssetStore:
+    """
+    The built assets, held in memory. They are read from static_dir if a
+    build is there; otherwise the pages in template_dir are built in memory,
+    so a checkout serves without the build step. Either happens on first use.
+    """
+
+    def __init__(self, static_dir, template_dir):
+        self.static_dir = static_dir
+        self.template_dir = template_dir
+        self._assets = None
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """The Asset served under name, or None."""
+        if self._assets is None:
+            self._load()
+        return self._assets.get(name)
+
+    def _load(self):
+        with self._lock:
+            if self._assets is not None:
+                return
+            try:
+                with open(os.path.join(self.static_dir, MANIFEST), "rb") as f:
+                    manifest = json.load(f)
+                files = None
+            except FileNotFoundError:
+                files = build_assets(read_pages(self.template_dir))
+                manifest = json.loads(files[MANIFEST])
+            assets = {}
+            for name, entry in manifest.items():
+                bodies = {None: self._read(files, name)}
+                for coding, suffix in CODINGS:
+                    if coding in entry["encodings"]:
+                        bodies[coding] = self._read(files, name + suffix)
+                assets[name] = Asset(name, entry["etag"], entry["immutable"], bodies)
+            self._assets = assets
+
+    def _read(self, files, name):
+        if files is not None:
+            return files[name]
+        with open(os.path.join(self.static_dir, name), "rb") as f:
+            return f.read()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Minify, fingerprint and precompress the dashboard pages.")
+    parser.add_argument("templates", help="directory holding index.html and forge.html")
+    parser.add_argument("static", help="directory to write the built assets to")
+    args = parser.parse_args(argv)
+
+    files = build_assets(read_pages(args.templates))
+    write_assets(files, args.static)
+    manifest = json.loads(files[MANIFEST])
+    for name, entry in sorted(manifest.items()):
+        sizes = ", ".join(f"{coding} {len(files[name + suffix]):,}"
+                          for coding, suffix in CODINGS if coding in entry["encodings"])
+        print(f"{name:<28} {len(files[name]):>8,} bytes" + (f" ({sizes})" if sizes else ""))
+
+if __name__ == "__main__":
+    main()
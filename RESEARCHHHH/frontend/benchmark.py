@@ -0,0 +1,178 @@
+"""
+Benchmarks for the threat -> rule pipeline.
+
+Times the engine, the forge and the two dashboard endpoints (through the
+Flask test client) at a range of rule-store sizes, and writes the results
+as JSON so runs can be compared:
+
+    python benchmark.py --sizes 0 10000 100000 --out bench.json
+    python benchmark.py --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# Benchmark an in-memory store, whatever the environment says
+os.environ.pop("RULE_STORE_PATH", None)
+
+import app
+from src.pipeline import threat_json
+from src.quarantine import QuarantineQueue
+from src.rule_forge import RuleForge
+from src.threat_engine import ThreatEngine
+
+DEFAULT_SIZES = [0, 1000, 10000, 100000]
+DEFAULT_OPS = 2000
+
+# Active threats held in quarantine while timing triage
+QUARANTINE_SIZE = 100000
+
+# Fresh interpreters started to time app startup
+STARTUP_RUNS = 10
+STARTUP_SCRIPT = "import app; app.create_app()"
+
+# Calls traced for peak memory; tracemalloc is too slow to leave on while timing
+MEMORY_OPS = 200
+
+def percentile(samples, fraction):
+    """samples must be sorted."""
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+def measure(call, ops, setup=None):
+    """
+    Runs call(arg) ops times, arg coming from setup(i) outside the timed
+    region, and returns ops/sec, p50/p99 latency in microseconds and the
+    peak traced memory of a shorter second pass in KiB. The second pass
+    gets fresh arguments, so a compile is traced as an insert again rather
+    than as a hit on what the timed pass already stored.
+    """
+    setup = setup or (lambda i: None)
+    args = [setup(i) for i in range(ops)]
+    timings = []
+    clock = time.perf_counter_ns
+    for arg in args:
+        start = clock()
+        call(arg)
+        timings.append(clock() - start)
+
+    args = [setup(ops + i) for i in range(MEMORY_OPS)]
+    tracemalloc.start()
+    for arg in args:
+        call(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    total = sum(timings)
+    return {
+        "ops": ops,
+        "ops_per_sec": round(ops / (total / 1e9), 1) if total else None,
+        "p50_us": round(percentile(timings, 0.50) / 1000, 2),
+        "p99_us": round(percentile(timings, 0.99) / 1000, 2),
+        "peak_kib": round(peak / 1024, 1)
+    }
+
+def filled_forge(engine, size):
+    """A fresh in-memory forge holding size rules, and the KiB it takes up."""
+    tracemalloc.start()
+    forge = RuleForge()
+    while len(forge.rules_db) < size:
+        batch = engine.spawn_batch(min(50000, size - len(forge.rules_db)))
+        forge.compile_batch(ThreatEngine.batch_to_threats(batch))
+        del batch
+    footprint, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return forge, round(footprint / 1024, 1)
+
+def start_app(_):
+    # A new process each time, so nothing is already imported
+    subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], check=True,
+                   cwd=os.path.dirname(os.path.abspath(app.__file__)))
+
+def engine_cases(engine, ops):
+    """Cases that don't touch the rule store; they run once, at store_size None."""
+    yield "spawn_threat", measure(lambda _: engine.spawn_threat(), ops)
+    yield "generate_payload", measure(lambda _: ThreatEngine.generate_payload(), ops)
+    yield "analyze_entropy", measure(
+        engine.analyze_entropy, ops, setup=lambda i: ThreatEngine.generate_payload())
+
+    # One arrival and one kill, so the queue stays at QUARANTINE_SIZE
+    queue = QuarantineQueue()
+    queue.push_batch(ThreatEngine.batch_to_threats(engine.spawn_batch(QUARANTINE_SIZE)))
+    yield "quarantine push+pop", measure(
+        lambda threat: (queue.push(threat), queue.pop()), ops, setup=lambda i: engine.spawn_threat())
+
+def store_cases(engine, client, forge, ops):
+    # Each compile gets a fresh threat so the store keeps growing, as it does live
+    yield "compile_rule", measure(
+        forge.compile_rule, ops, setup=lambda i: engine.spawn_threat())
+
+    client.application.extensions['pipeline'].forge = forge
+    yield "GET /api/threat/spawn", measure(lambda _: client.get('/api/threat/spawn'), ops)
+    yield "POST /api/rule/compile", measure(
+        lambda body: client.post('/api/rule/compile', data=body, content_type='application/json'),
+        ops, setup=lambda i: json.dumps(threat_json(engine.spawn_threat())))
+
+def run(sizes, ops):
+    engine = ThreatEngine()
+    client = app.create_app().test_client()
+    results = [dict(case="startup (create_app)", store_size=None, **measure(start_app, STARTUP_RUNS))]
+    report(results[-1])
+    for case, stats in engine_cases(engine, ops):
+        results.append(dict(case=case, store_size=None, **stats))
+        report(results[-1])
+
+    for size in sizes:
+        forge, store_kib = filled_forge(engine, size)
+        for case, stats in store_cases(engine, client, forge, ops):
+            results.append(dict(case=case, store_size=size, store_kib=store_kib, **stats))
+            report(results[-1])
+        forge.close()
+    return results
+
+def report(result, baseline=None):
+    size = "-" if result["store_size"] is None else result["store_size"]
+    line = (f"{result['case']:<24} {size:>8} {result['ops_per_sec']:>12,.0f}/s "
+            f"p50 {result['p50_us']:>9.1f}us p99 {result['p99_us']:>9.1f}us "
+            f"peak {result['peak_kib']:>9.1f}KiB")
+    if baseline and baseline.get("ops_per_sec"):
+        change = (result["ops_per_sec"] / baseline["ops_per_sec"] - 1) * 100
+        line += f"  {change:+6.1f}% vs baseline"
+    print(line, flush=True)
+
+def compare(results, path):
+    with open(path) as f:
+        previous = {(r["case"], r["store_size"]): r for r in json.load(f)["results"]}
+    print(f"\nCompared with {path}:")
+    for result in results:
+        report(result, previous.get((result["case"], result["store_size"])))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="rule-store sizes to benchmark the forge and endpoints at")
+    parser.add_argument("--ops", type=int, default=DEFAULT_OPS, help="calls timed per case")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="a previous --out file to compare against")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.ops)
+    if args.baseline:
+        compare(results, args.baseline)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({
+                "created_at": time.time(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "ops": args.ops,
+                "results": results
+            }, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import socket
+
+def ip_to_int(ip):
+    """Packs a dotted IPv4 string into an unsigned 32-bit integer."""
+    return int.from_bytes(socket.inet_aton(ip), 'big')
+
+def int_to_ip(value):
+    """Unpacks a 32-bit integer into a dotted IPv4 string."""
+    return socket.inet_ntoa(value.to_bytes(4, 'big'))
+
+def _mask(prefix_len):
+    return (0xFFFFFFFF << (32 - prefix_len)) & 0xFFFFFFFF
+
+def _bit(ip, depth):
+    return (ip >> (31 - depth)) & 1
+
+def _add_members(members, more):
+    for block, count in more.items():
+        members[block] = members.get(block, 0) + count
+
+# Node layout: [network, prefix_len, zero_child, one_child, entry]
+NET, LEN, ENTRY = 0, 1, 4
+
+class CidrTable:
+    """
+    Path-compressed binary radix (Patricia) tree of CIDR blocks with
+    longest-prefix-match lookup.
+
+    Each node holds its own network and prefix length, so chains of
+    single-child nodes are skipped and a lone /32 costs one node. entry is
+    (action, rule_count, members), or None for pure branch nodes. Blocks
+    already covered by a block with the same action are folded into it, and
+    two sibling blocks with the same action are merged into their covering
+    block, so runs of adjacent /32 rules collapse as they arrive.
+
+    members maps each block folded into an entry to its rule count (None
+    when the entry is just its own block), so removing a rule from a merged
+    block re-inserts the surviving members and splits it again: lookups
+    and exports always reflect the live rules.
+
+    Folding is lossy by design: a later, more specific block with a
+    different action also overrides the rules folded into its cover.
+    """
+
+    def __init__(self):
+        self.root = [0, 0, None, None, None]
+
+    def insert(self, ip, prefix_len=32, action="DROP", count=1):
+        ip &= _mask(prefix_len)
+        node, path, covering = self.root, [], None
+        while node[LEN] != prefix_len:
+            if node[ENTRY] is not None:
+                covering = node
+            slot = 2 + _bit(ip, node[LEN])
+            path.append((node, slot))
+            child = node[slot]
+            if child is None:
+                node[slot] = node = [ip, prefix_len, None, None, None]
+                break
+
+            common = min(child[LEN], prefix_len)
+            diff = (child[NET] ^ ip) & _mask(common)
+            if diff:
+                common = 32 - diff.bit_length()
+            if common == child[LEN]:
+                node = child
+                continue
+
+            # Split the edge: the new block or a branch node takes the child's place
+            if common == prefix_len:
+                split = [ip, prefix_len, None, None, None]
+            else:
+                split = [ip & _mask(common), common, None, None, None]
+            split[2 + _bit(child[NET], common)] = child
+            node[slot] = split
+            if common != prefix_len:
+                path.append((split, 2 + _bit(ip, common)))
+                split[2 + _bit(ip, common)] = node = [ip, prefix_len, None, None, None]
+            else:
+                node = split
+            break
+
+        # Same-action blocks below are absorbed; a different action on this
+        # exact block is simply replaced
+        members = {(ip, prefix_len): count}
+        _add_members(members, self._absorb(node, action))
+        node[ENTRY] = None
+        if covering is not None and covering[ENTRY][0] == action:
+            folded = dict(self._members(covering))
+            _add_members(folded, members)
+            self._set(covering, action, folded)
+            self._prune(path)
+            return
+
+        self._set(node, action, members)
+        self._merge(path)
+
+    def remove(self, ip, action="DROP", count=1):
+        """
+        Takes count rules off the member block holding ip within the longest
+        block covering it with this action. When that member is gone from a
+        merged or covering block, the block is split back into its
+        surviving members.
+        """
+        node, path, best = self.root, [], None
+        while node is not None and (ip ^ node[NET]) & _mask(node[LEN]) == 0:
+            if node[ENTRY] is not None and node[ENTRY][0] == action:
+                best = (node, len(path))
+            if node[LEN] == 32:
+                break
+            slot = 2 + _bit(ip, node[LEN])
+            path.append((node, slot))
+            node = node[slot]
+
+        if best is None:
+            return
+        node, depth = best
+        members = dict(self._members(node))
+        for prefix_len in range(32, node[LEN] - 1, -1):
+            key = (ip & _mask(prefix_len), prefix_len)
+            if key in members:
+                break
+        else:
+            return
+        remaining = members.pop(key) - count
+        if remaining > 0:
+            members[key] = remaining
+        if remaining > 0 or (node[NET], node[LEN]) in members:
+            # Coverage is unchanged, only the counts
+            self._set(node, action, members)
+            return
+        node[ENTRY] = None
+        self._prune(path[:depth])
+        for (net, prefix_len), rules in members.items():
+            self.insert(net, prefix_len, action, rules)
+
+    def lookup(self, ip):
+        """Returns (network, prefix_len, action) of the longest matching block, or None."""
+        node, best = self.root, None
+        while node is not None and (ip ^ node[NET]) & _mask(node[LEN]) == 0:
+            if node[ENTRY] is not None:
+                best = node
+            if node[LEN] == 32:
+                break
+            node = node[2 + _bit(ip, node[LEN])]
+
+        if best is None:
+            return None
+        return best[NET], best[LEN], best[ENTRY][0]
+
+    def export(self):
+        """Yields the minimized block list in address order."""
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node[ENTRY] is not None:
+                action, count, _ = node[ENTRY]
+                yield {"cidr": f"{int_to_ip(node[NET])}/{node[LEN]}", "action": action, "rules": count}
+            for slot in (3, 2):
+                if node[slot] is not None:
+                    stack.append(node[slot])
+
+    def _set(self, node, action, members):
+        count = sum(members.values())
+        if len(members) == 1 and (node[NET], node[LEN]) in members:
+            members = None
+        node[ENTRY] = (action, count, members)
+
+    def _members(self, node):
+        action, count, members = node[ENTRY]
+        return {(node[NET], node[LEN]): count} if members is None else members
+
+    def _absorb(self, node, action):
+        # Drops entries below (and at) node that the new block makes redundant
+        # and returns their members. Descent stops at blocks with a different
+        # action, which still override.
+        members = {}
+        if node[ENTRY] is not None and node[ENTRY][0] == action:
+            members = dict(self._members(node))
+            node[ENTRY] = None
+        for slot in (2, 3):
+            child = node[slot]
+            if child is None or (child[ENTRY] is not None and child[ENTRY][0] != action):
+                continue
+            _add_members(members, self._absorb(child, action))
+            node[slot] = self._collapse(child)
+        return members
+
+    def _collapse(self, node):
+        # A branch node without an entry is only needed while it has two children
+        if node[ENTRY] is not None or (node[2] is not None and node[3] is not None):
+            return node
+        return node[2] if node[2] is not None else node[3]
+
+    def _merge(self, path):
+        for parent, _ in reversed(path):
+            zero, one = parent[2], parent[3]
+            if parent[ENTRY] is not None or zero is None or one is None:
+                break
+            if zero[LEN] != parent[LEN] + 1 or one[LEN] != parent[LEN] + 1:
+                break
+            if zero[2] or zero[3] or one[2] or one[3]:
+                break
+            if zero[ENTRY] is None or one[ENTRY] is None or zero[ENTRY][0] != one[ENTRY][0]:
+                break
+            members = dict(self._members(zero))
+            _add_members(members, self._members(one))
+            self._set(parent, zero[ENTRY][0], members)
+            parent[2] = parent[3] = None
+
+    def _prune(self, path):
+        for parent, slot in reversed(path):
+            child = parent[slot]
+            collapsed = self._collapse(child)
+            if collapsed is child:
+                break
+            parent[slot] = collapsed
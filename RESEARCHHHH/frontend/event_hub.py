@@ -0,0 +1,114 @@
+import threading
+from collections import deque
+
+class Subscription:
+    """
+    A subscriber's bounded event queue. When a slow client lets it fill up,
+    the oldest events are dropped and counted instead of growing without
+    bound, so one stalled dashboard can't hold server memory hostage.
+
+    notify, if given, is called from the publishing thread whenever the
+    queue goes from empty to non-empty, so an async client can be woken
+    instead of polling.
+    """
+
+    def __init__(self, maxlen, notify=None):
+        self.queue = deque(maxlen=maxlen)
+        self.dropped = 0
+        self.notify = notify
+
+    def drain(self, limit):
+        """Pops up to limit (seq, kind, json) events; returns them with the drop count since the last drain."""
+        events = []
+        while self.queue and len(events) < limit:
+            events.append(self.queue.popleft())
+        dropped, self.dropped = self.dropped, 0
+        return events, dropped
+
+class EventHub:
+    """
+    Fan-out of threat, rule and kill events to streaming clients. Events are
+    published as already-serialized JSON so each is encoded once, not once
+    per subscriber.
+
+    Every event gets a sequence number, and the last `recent` events are
+    kept in a ring so a client can resume from its last seen number (the
+    stream's Last-Event-ID) and get only what it missed.
+    """
+
+    def __init__(self, recent=1000):
+        self.cond = threading.Condition()
+        self.subscribers = set()
+        self.seq = 0
+        self.recent = deque(maxlen=recent)
+
+    def subscribe(self, maxlen=1000, since=None, notify=None):
+        """
+        A new subscription; with since, it starts with the retained events
+        after that sequence number, counting any that already aged out of
+        the ring as dropped. A cursor from a previous server process (ahead
+        of the current sequence) replays the whole ring.
+        """
+        sub = Subscription(maxlen, notify)
+        with self.cond:
+            if since is not None:
+                if since > self.seq:
+                    since = 0
+                backlog = [event for event in self.recent if event[0] > since]
+                oldest = self.recent[0][0] if self.recent else self.seq + 1
+                sub.dropped = max(0, oldest - since - 1) + max(0, len(backlog) - maxlen)
+                sub.queue.extend(backlog)
+            self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self.cond:
+            self.subscribers.discard(sub)
+
+    def publish(self, kind, data_json):
+        with self.cond:
+            self.seq += 1
+            event = (self.seq, kind, data_json)
+            self.recent.append(event)
+            for sub in self.subscribers:
+                if len(sub.queue) == sub.queue.maxlen:
+                    sub.dropped += 1
+                woken = not sub.queue
+                sub.queue.append(event)
+                # Only after the append, so a woken reader finds the event
+                if woken and sub.notify is not None:
+                    sub.notify()
+            self.cond.notify_all()
+
+    def wait(self, sub, timeout):
+        """Blocks until sub has events or timeout passes; returns whether it has any."""
+        with self.cond:
+            if not sub.queue:
+                self.cond.wait(timeout)
+            return bool(sub.queue)
+
+def encode_frame(events, dropped):
+    """Coalesces drained events into one JSON frame body."""
+    threats = [data for _, kind, data in events if kind == "threat"]
+    rules = [data for _, kind, data in events if kind == "rule"]
+    kills = [data for _, kind, data in events if kind == "kill"]
+    return '{"threats":[%s],"rules":[%s],"kills":[%s],"dropped":%d}' % (
+        ','.join(threats), ','.join(rules), ','.join(kills), dropped)
+
+def sse_frame(events, dropped):
+    """
+    A "batch" server-sent event; its id is the last sequence number, for
+    resuming. A frame that only reports drops carries no id, so the
+    client's cursor stays where it was.
+    """
+    body = "event: batch\ndata: %s\n\n" % encode_frame(events, dropped)
+    return "id: %d\n%s" % (events[-1][0], body) if events else body
+
+def stream_cursor(last_event_id, since):
+    """The sequence number a stream resumes after: Last-Event-ID wins over ?since=."""
+    for value in (last_event_id, since):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            continue
+    return None
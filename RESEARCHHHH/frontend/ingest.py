@@ -0,0 +1,109 @@
+import ipaddress
+import json
+import math
+import time
+
+from src.entropy import entropy_score
+from src.rule_store import TYPE_CODES
+from src.threat_engine import Threat, ThreatEngine
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# Smallest payload a rule signature can be cut from
+MIN_PAYLOAD_BYTES = 4
+
+class ThreatValidationError(ValueError):
+    """A posted threat failed the schema check; index is its position in the batch."""
+
+    def __init__(self, message, index=0):
+        super().__init__(message)
+        self.index = index
+
+def validate_threat(data, index=0):
+    """
+    Checks a posted threat dict and builds a Threat from it.
+
+    type, src and payload (hex, spaces allowed) are required; id, name,
+    score, dst, timestamp and status fall back to defaults, and entropy is
+    always recomputed from the payload.
+    """
+    if not isinstance(data, dict):
+        raise ThreatValidationError("threat must be a JSON object", index)
+
+    t_type = data.get("type")
+    if t_type not in TYPE_CODES:
+        raise ThreatValidationError(f"unknown threat type: {t_type!r}", index)
+
+    # IPv4Address is strict where inet_aton is not: no trailing junk, no
+    # octal-looking octets, exactly four parts
+    src = data.get("src")
+    try:
+        src_ip = int(ipaddress.IPv4Address(src)) if isinstance(src, str) else None
+    except ValueError:
+        src_ip = None
+    if src_ip is None:
+        raise ThreatValidationError(f"src must be a dotted IPv4 address: {src!r}", index)
+
+    payload = data.get("payload")
+    try:
+        payload = bytes.fromhex(payload)
+    except (TypeError, ValueError):
+        raise ThreatValidationError("payload must be a hex string", index)
+    if len(payload) < MIN_PAYLOAD_BYTES:
+        raise ThreatValidationError(f"payload must be at least {MIN_PAYLOAD_BYTES} bytes", index)
+
+    score = data.get("score", 0)
+    if not isinstance(score, int) or isinstance(score, bool) or not 0 <= score <= 100:
+        raise ThreatValidationError("score must be an integer from 0 to 100", index)
+
+    timestamp = data.get("timestamp")
+    if timestamp is None:
+        timestamp = time.time()
+    elif (not isinstance(timestamp, (int, float)) or isinstance(timestamp, bool)
+          or not math.isfinite(timestamp)):
+        raise ThreatValidationError("timestamp must be a finite number of seconds", index)
+
+    return Threat(
+        id=str(data.get("id", "")),
+        name=str(data.get("name", "")),
+        type=t_type,
+        score=score,
+        src=src_ip,
+        dst=str(data.get("dst", ThreatEngine.PROTECTED_NODE)),
+        payload=payload,
+        entropy=round(entropy_score(payload), 1),
+        timestamp=float(timestamp),
+        status=str(data.get("status", "active"))
+    )
+
+def parse_threats(body, content_type):
+    """
+    Parses a POST body into a list of Threats.
+
+    Accepts one JSON object, a JSON array, or NDJSON (one object per line).
+    Returns (threats, is_bulk); raises ThreatValidationError on bad input.
+    """
+    if content_type and content_type.split(';')[0].strip() in NDJSON_TYPES:
+        return list(iter_ndjson(body.splitlines())), True
+
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        raise ThreatValidationError(f"invalid JSON: {e}")
+
+    if isinstance(data, list):
+        return [validate_threat(item, i) for i, item in enumerate(data)], True
+    return [validate_threat(data)], False
+
+def iter_ndjson(lines):
+    """Lazily validates NDJSON threat lines, skipping blank ones."""
+    index = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            raise ThreatValidationError(f"invalid JSON: {e}", index)
+        yield validate_threat(data, index)
+        index += 1
@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+# Set METRICS=0 to turn sampling off entirely; /metrics then reports nothing
+METRICS_ENABLED = os.environ.get("METRICS", "1") != "0"
+
+# Latency buckets in seconds, 10 us to 2.5 s
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+                   0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Quarantine dwell buckets in seconds, 100 ms to an hour
+DWELL_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    __slots__ = ('registry', 'value')
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.value = 0
+
+    def inc(self, amount=1):
+        if self.registry.enabled:
+            with self.registry.lock:
+                self.value += amount
+
+class Histogram:
+    __slots__ = ('registry', 'buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, registry, buckets):
+        self.registry = registry
+        self.buckets = buckets
+        # One slot per bucket plus +Inf; made cumulative only when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        if not self.registry.enabled:
+            return
+        i = bisect_left(self.buckets, value)
+        with self.registry.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Context manager observing the duration of its block."""
+        return _Timer(self)
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter() if self.histogram.registry.enabled else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            self.histogram.observe(time.perf_counter() - self.start)
+
+class Family:
+    """A named metric and its children, one per combination of label values."""
+
+    def __init__(self, registry, kind, name, help, labelnames, make_child):
+        self.registry = registry
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._make_child = make_child
+        self.children = {}
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            with self.registry.lock:
+                child = self.children.setdefault(values, self._make_child())
+        return child
+
+    # Unlabelled families stand in for their only child
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def samples(self):
+        with self.registry.lock:
+            children = [(values, child, list(child.counts) if self.kind == "histogram" else None)
+                        for values, child in self.children.items()]
+        for values, child, counts in children:
+            if self.kind == "counter":
+                yield self.name + _labels(self.labelnames, values), child.value
+                continue
+            cumulative = 0
+            bounds = [repr(float(bound)) for bound in child.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield self.name + "_bucket" + _labels(self.labelnames, values, f'le="{bound}"'), cumulative
+            yield self.name + "_sum" + _labels(self.labelnames, values), child.sum
+            yield self.name + "_count" + _labels(self.labelnames, values), child.count
+
+class Gauge:
+    """A value read from read() at scrape time; read may return a number or {label values: number}."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames, read):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.read = read
+
+    def samples(self):
+        value = self.read()
+        if not isinstance(value, dict):
+            value = {(): value}
+        for values, number in value.items():
+            yield self.name + _labels(self.labelnames, values), number
+
+class Registry:
+    """
+    In-process counters and histograms, rendered in the Prometheus text
+    format. Recording is a bisect and a short critical section; with
+    sampling disabled it is a single attribute check.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.metrics = []
+
+    def counter(self, name, help, labelnames=()):
+        family = Family(self, "counter", name, help, labelnames, lambda: Counter(self))
+        self.metrics.append(family)
+        return family
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        family = Family(self, "histogram", name, help, labelnames, lambda: Histogram(self, buckets))
+        self.metrics.append(family)
+        return family
+
+    def gauge(self, name, help, read, labelnames=()):
+        """
+        Registers a gauge read at scrape time. Registering a name again
+        replaces the earlier gauge, so a new Pipeline takes over its gauges
+        rather than repeating them (and keeping the old one alive).
+        """
+        gauge = Gauge(name, help, labelnames, read)
+        with self.lock:
+            metrics = [metric for metric in self.metrics if metric.name != name]
+            metrics.append(gauge)
+            self.metrics = metrics
+        return gauge
+
+    def render(self):
+        if not self.enabled:
+            return "# metrics disabled\n"
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{sample} {_number(value)}" for sample, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+def timed(histogram):
+    """Decorator observing each call's duration in histogram (a Histogram or unlabelled Family)."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+REGISTRY = Registry()
+
+THREATS_SPAWNED = REGISTRY.counter(
+    "gg_threats_spawned_total", "Threats generated by the engine.")
+RULES_COMPILED = REGISTRY.counter(
+    "gg_rules_compiled_total", "Threats compiled into rules, counting deduplicated hits.")
+STAGE_SECONDS = REGISTRY.histogram(
+    "gg_stage_seconds", "Time spent per call in each pipeline stage.", ("stage",))
+REQUEST_SECONDS = REGISTRY.histogram(
+    "gg_request_seconds", "Time to build each API response, by route.", ("route",))
+REQUESTS = REGISTRY.counter(
+    "gg_requests_total", "API requests served, by route and status.", ("route", "status"))
+QUARANTINE_KILLS = REGISTRY.counter(
+    "gg_quarantine_kills_total", "Threats neutralized by the quarantine scheduler.")
+QUARANTINE_OVERFLOW = REGISTRY.counter(
+    "gg_quarantine_overflow_total", "Threats turned away because the quarantine queue was full.")
+QUARANTINE_DWELL_SECONDS = REGISTRY.histogram(
+    "gg_quarantine_dwell_seconds", "Time threats spent quarantined before being neutralized.",
+    buckets=DWELL_BUCKETS)
+
+SPAWN_SECONDS = STAGE_SECONDS.labels("spawn")
+SPAWN_BATCH_SECONDS = STAGE_SECONDS.labels("spawn_batch")
+COMPILE_SECONDS = STAGE_SECONDS.labels("compile")
+COMPILE_BATCH_SECONDS = STAGE_SECONDS.labels("compile_batch")
+SERIALIZE_SECONDS = STAGE_SECONDS.labels("serialize")
+
+# Streams stay open for the whole session, so their duration says nothing about latency
+UNTIMED_ROUTES = {"/api/stream"}
+
+def observe_request(route, status, seconds):
+    """Records one request; route is the matched pattern, never the raw path."""
+    REQUESTS.labels(route, status).inc()
+    if REGISTRY.enabled and route not in UNTIMED_ROUTES:
+        REQUEST_SECONDS.labels(route).observe(seconds)
@@ -0,0 +1,370 @@
+import atexit
+import json
+import math
+import os
+import random
+import threading
+import time
+
+from src.event_hub import EventHub
+from src.ingest import ThreatValidationError
+from src.metrics import REGISTRY, SERIALIZE_SECONDS
+from src.quarantine import QuarantineScheduler
+from src.rule_forge import RuleForge
+from src.rule_store import TYPE_CODES
+from src.stats import DashboardStats
+from src.threat_engine import ThreatEngine
+
+# Where the rule store persists (<path>.dat / <path>.log); unset keeps it in memory
+RULE_STORE_PATH = os.environ.get("RULE_STORE_PATH")
+
+# Retention: at most RULE_MAX_RULES active rules, and a top-priority rule
+# expires after RULE_TTL idle seconds (lower priorities proportionally sooner)
+RULE_MAX_RULES = int(os.environ.get("RULE_MAX_RULES", 100000))
+RULE_TTL = float(os.environ.get("RULE_TTL", 86400))
+
+# Server-side neutralization: worker threads, seconds between kills per worker
+# (the dashboard used to neutralize on 55% of its 900 ms ticks) and the most
+# threats held in quarantine at once
+QUARANTINE_WORKERS = int(os.environ.get("QUARANTINE_WORKERS", 1))
+QUARANTINE_INTERVAL = float(os.environ.get("QUARANTINE_INTERVAL", 1.6))
+QUARANTINE_CAPACITY = int(os.environ.get("QUARANTINE_CAPACITY", 250000))
+
+# Upper bound for /api/quarantine?top=N
+QUARANTINE_TOP = 100
+
+# Upper bound for /api/threat/spawn?count=N
+MAX_SPAWN_BATCH = 100000
+
+# Live feed cadence, matching the dashboards' old 900 ms polling tick
+FEED_INTERVAL = 0.9
+FEED_SPAWN_CHANCE = 0.8
+
+# With SIMULATOR_WORKERS > 0 the live feed compiles traffic from that many
+# generator processes (src/simulator.py) instead of one threat per tick
+SIMULATOR_WORKERS = int(os.environ.get("SIMULATOR_WORKERS", 0))
+# Feed thread back-off while the simulator rings are empty or no one listens
+SIMULATOR_IDLE = 0.005
+
+# Threats compiled per store-lock acquisition when streaming rule ids back
+COMPILE_CHUNK = 256
+
+# Findings listed by /api/rules/analyze by default, and at most
+ANALYZE_LIMIT = 100
+MAX_ANALYZE_LIMIT = 10000
+
+# Rules fetched per store-lock acquisition while streaming an export
+EXPORT_CHUNK = 1000
+
+# JSON responses at least this many bytes are gzipped, at this level, for
+# clients that accept it; streamed responses are sent as they are
+JSON_GZIP_MIN_BYTES = int(os.environ.get("JSON_GZIP_MIN_BYTES", 1024))
+JSON_GZIP_LEVEL = int(os.environ.get("JSON_GZIP_LEVEL", 5))
+
+# Stream tuning: coalescing window, max events per frame, per-client queue bound
+STREAM_WINDOW = 0.1
+# Bounds for a client's ?window=; a zero window would spin a core per client
+STREAM_MIN_WINDOW = 0.01
+STREAM_MAX_WINDOW = 5.0
+STREAM_MAX_EVENTS = 500
+STREAM_QUEUE = 1000
+STREAM_KEEPALIVE = 15.0
+# Recent events kept for clients resuming from a cursor
+STREAM_RECENT = 1000
+
+# Dashboard chart window: 40 buckets of 15 s (the heat matrix has 40 columns)
+STATS_BUCKET_SECONDS = 15.0
+STATS_BUCKETS = 40
+STATS_HEAT_ROWS = 8
+
+class ExportCursorError(ValueError):
+    """An export cursor is malformed or predates the last compaction."""
+
+def encode_cursor(generation, position):
+    return f"{generation}.{position}"
+
+def decode_cursor(cursor, generation):
+    try:
+        cursor_generation, position = (int(part) for part in cursor.split('.'))
+    except ValueError:
+        raise ExportCursorError(f"malformed cursor: {cursor!r}")
+    if cursor_generation != generation:
+        raise ExportCursorError("cursor expired: the rule store was compacted since it was issued")
+    return position
+
+def stream_window(ms):
+    """A ?window= in milliseconds as seconds, clamped to the stream window bounds."""
+    seconds = ms / 1000
+    if math.isnan(seconds):
+        return STREAM_WINDOW
+    return max(STREAM_MIN_WINDOW, min(seconds, STREAM_MAX_WINDOW))
+
+def threat_json(threat):
+    """Renders a threat for the dashboards, with the payload as spaced hex."""
+    data = threat.to_dict()
+    data["payload"] = threat.payload.hex(' ')
+    return data
+
+def batch_json(batch):
+    """
+    Renders a spawn_batch() result as threat_json() renders each threat,
+    a column at a time instead of through Threat records.
+    """
+    import numpy as np
+
+    src = batch["src"]
+    octets = [(src >> shift & 0xFF).tolist() for shift in (24, 16, 8, 0)]
+    names = np.array(ThreatEngine.CODENAMES)[batch["name"]].tolist()
+    types = np.array(ThreatEngine.THREAT_TYPES)[batch["type"]].tolist()
+    # One spaced hex string for the whole matrix, sliced per row
+    payload = batch["payload"]
+    step = payload.shape[1] * 3
+    spaced = payload.tobytes().hex(' ')
+    columns = zip(batch["id"].tolist(), names, types, batch["score"].tolist(), *octets,
+                  batch["entropy"].round(1).tolist(), batch["timestamp"].tolist())
+    return [{"id": f"{threat_id:08X}", "name": name, "type": t_type, "score": score,
+             "src": f"{a}.{b}.{c}.{d}", "dst": ThreatEngine.PROTECTED_NODE,
+             "payload": spaced[i * step:(i + 1) * step - 1], "entropy": entropy,
+             "timestamp": timestamp, "status": "active"}
+            for i, (threat_id, name, t_type, score, a, b, c, d, entropy, timestamp) in enumerate(columns)]
+
+class Pipeline:
+    """
+    The engine, forge, quarantine and event hub shared by the API handlers.
+    Both the Flask app and the ASGI app are thin adapters over one of these,
+    so the serving mode doesn't change what the endpoints do.
+    """
+
+    def __init__(self):
+        self.engine = ThreatEngine()
+        self.forge = RuleForge(RULE_MAX_RULES, RULE_TTL, path=RULE_STORE_PATH)
+        self.hub = EventHub(STREAM_RECENT)
+        self.stats = DashboardStats(STATS_BUCKET_SECONDS, STATS_BUCKETS)
+        self.quarantine = QuarantineScheduler(self, QUARANTINE_WORKERS, QUARANTINE_INTERVAL,
+                                              QUARANTINE_CAPACITY)
+        REGISTRY.gauge("gg_rules", "Rules held by the forge; the snapshot count includes "
+                       "rules deleted since the last compaction.", self.rule_counts, ("store",))
+        REGISTRY.gauge("gg_quarantine_depth", "Threats waiting in quarantine.",
+                       lambda: len(self.quarantine.queue))
+        self._feed = None
+        self._feed_lock = threading.Lock()
+        self._feed_stop = threading.Event()
+
+    def rule_counts(self):
+        counts = {("memory",): len(self.forge.rules_db)}
+        if self.forge.disk is not None:
+            counts[("snapshot",)] = self.forge.disk.count
+        return counts
+
+    def spawn(self):
+        """Spawns one threat, quarantines it and pushes it to stream clients."""
+        threat = self.engine.spawn_threat()
+        self.stats.record_collected((threat,))
+        self.quarantine.submit((threat,))
+        self.publish_threat(threat)
+        return threat
+
+    def spawn_batch(self, count):
+        """
+        Spawns up to MAX_SPAWN_BATCH threats at once and quarantines them.
+        Returns the columnar spawn_batch() result, for batch_json(). Raises
+        ValueError for a count below 1.
+        """
+        if count < 1:
+            raise ValueError("count must be a positive integer")
+        batch = self.engine.spawn_batch(min(count, MAX_SPAWN_BATCH))
+        # The quarantine queue holds Threat records
+        threats = self.engine.batch_to_threats(batch)
+        self.stats.record_collected(threats)
+        self.quarantine.submit(threats)
+        return batch
+
+    def compile(self, threat):
+        """Compiles a rule for a (killed) threat and pushes it to stream clients."""
+        rule = self.forge.compile_rule(threat)
+        self.stats.record_kills((threat,))
+        self.quarantine.discard((threat,))
+        self.publish_rule(rule)
+        return rule
+
+    def compile_batch(self, threats):
+        """Compiles a validated batch in one pass and pushes the rules to stream clients."""
+        rules = self.forge.compile_batch(threats)
+        self.stats.record_kills(threats)
+        self.quarantine.discard(threats)
+        for rule in rules:
+            self.publish_rule(rule)
+        return rules
+
+    def compile_stream(self, threats):
+        """
+        Compiles threats as they arrive, yielding one NDJSON line per rule id.
+        A validation error ends the stream with an error line; rules compiled
+        before it are kept.
+        """
+        pending = []
+        try:
+            for threat in threats:
+                pending.append(threat)
+                if len(pending) >= COMPILE_CHUNK:
+                    yield from self._rule_id_lines(pending)
+                    pending = []
+        except ThreatValidationError as e:
+            yield from self._rule_id_lines(pending)
+            yield json.dumps({"error": str(e), "index": e.index}) + "\n"
+            return
+        yield from self._rule_id_lines(pending)
+
+    def _rule_id_lines(self, threats):
+        return ['{"rule_id":"%s"}\n' % rule.rule_id for rule in self.compile_batch(threats)]
+
+    def export_rules(self, fmt="ndjson", cursor=None, limit=None, **filters):
+        """
+        Streams the policy fabric as NDJSON lines or chunks of one JSON
+        document, fetching EXPORT_CHUNK rules per lock acquisition. filters
+        are RuleForge.export_page() filters. With a limit, the output ends
+        with a next_cursor to resume from; it is null once nothing is left.
+        If a compaction renumbers the store mid-export, the output ends
+        early with "expired": true (a JSON field, or a last NDJSON line) and
+        the export has to be restarted from the beginning.
+        Raises ExportCursorError for a bad cursor, and ValueError for a bad
+        limit or type, before anything is sent.
+        """
+        forge = self.forge
+        generation = forge.generation
+        start = 0 if cursor is None else decode_cursor(cursor, generation)
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be a positive integer")
+        if filters.get("type") is not None and filters["type"] not in TYPE_CODES:
+            raise ValueError(f"unknown threat type: {filters['type']!r}")
+        return self._export_chunks(fmt, generation, start, limit, filters)
+
+    def _export_chunks(self, fmt, generation, pos, limit, filters):
+        forge = self.forge
+        remaining = limit
+        first = True
+        expired = False
+        yield '{"rules":[' if fmt == "json" else ''
+        while pos is not None and remaining != 0:
+            size = EXPORT_CHUNK if remaining is None else min(EXPORT_CHUNK, remaining)
+            page, pos = forge.export_page(pos, size, **filters)
+            # Generations only grow, so an unchanged one means the page was
+            # read before any compaction renumbered the store
+            if forge.generation != generation:
+                expired = True
+                break
+            if remaining is not None:
+                remaining -= len(page)
+            rules = [json.dumps(rule.to_dict(), separators=(",", ":")) for _, rule in page]
+            if not rules:
+                continue
+            if fmt == "json":
+                yield ('' if first else ',') + ','.join(rules)
+            else:
+                yield '\n'.join(rules) + '\n'
+            first = False
+
+        if expired:
+            trailer = {"next_cursor": None, "expired": True,
+                       "error": "the policy was compacted during the export; restart it"}
+            yield '],%s' % json.dumps(trailer)[1:] if fmt == "json" else json.dumps(trailer) + '\n'
+            return
+        next_cursor = None if pos is None else encode_cursor(generation, pos)
+        if fmt == "json":
+            yield '],"next_cursor":%s}' % json.dumps(next_cursor)
+        elif limit is not None:
+            yield json.dumps({"next_cursor": next_cursor}) + '\n'
+
+    def publish_threat(self, threat):
+        with SERIALIZE_SECONDS.time():
+            data = json.dumps(threat_json(threat), separators=(",", ":"))
+        self.hub.publish("threat", data)
+
+    def publish_rule(self, rule):
+        with SERIALIZE_SECONDS.time():
+            data = json.dumps(rule.to_dict(), separators=(",", ":"))
+        self.hub.publish("rule", data)
+
+    def quarantine_status(self, top=0):
+        """The quarantine snapshot with the top threats rendered for the dashboards."""
+        status = self.quarantine.snapshot(max(0, min(top, QUARANTINE_TOP)))
+        status["top"] = [threat_json(threat) for threat in status["top"]]
+        return status
+
+    def update_quarantine(self, data):
+        """
+        Applies a {"id", "score", "status"} update to a queued threat and
+        returns it, or None if it isn't queued. Raises ValueError for a
+        malformed update.
+        """
+        if not isinstance(data, dict) or not isinstance(data.get("id"), str):
+            raise ValueError("id must be a string")
+        score = data.get("score")
+        if score is not None and (not isinstance(score, int) or isinstance(score, bool)
+                                  or not 0 <= score <= 100):
+            raise ValueError("score must be an integer from 0 to 100")
+        return self.quarantine.update(data["id"], score, data.get("status"))
+
+    def publish_kill(self, threat, dwell, depth):
+        with SERIALIZE_SECONDS.time():
+            data = json.dumps({"id": threat.id, "name": threat.name, "type": threat.type,
+                               "score": threat.score, "dwell": round(dwell, 3), "depth": depth},
+                              separators=(",", ":"))
+        self.hub.publish("kill", data)
+
+    def feed_tick(self):
+        """One step of the live threat feed; only spawns while someone is listening."""
+        if self.hub.subscribers and random.random() < FEED_SPAWN_CHANCE:
+            self.spawn()
+
+    def simulator_tick(self, sim):
+        """
+        Compiles the records waiting in a ThreatSimulator's rings into the
+        forge and pushes the rules to stream clients. Threats are built
+        straight from the ring views before they are released. Returns how
+        many were compiled; nothing is drained while no one is listening.
+        """
+        if not self.hub.subscribers:
+            return 0
+        compiled = 0
+        for records in sim.drain():
+            threats = self.engine.batch_to_threats(records)
+            self.stats.record_collected(threats)
+            self.compile_batch(threats)
+            compiled += len(threats)
+        return compiled
+
+    def start_threat_feed(self):
+        """
+        Starts the background thread that pushes live threats to stream
+        clients, and the quarantine workers. With SIMULATOR_WORKERS set, the
+        thread drains a ThreatSimulator instead.
+        """
+        self.quarantine.start()
+        with self._feed_lock:
+            if self._feed is None:
+                target = self._simulated_feed if SIMULATOR_WORKERS > 0 else self._threat_feed
+                self._feed = threading.Thread(target=target, daemon=True)
+                self._feed.start()
+                # The simulator's processes and shared memory must not outlive us
+                atexit.register(self.stop_threat_feed)
+
+    def stop_threat_feed(self):
+        """Stops the feed thread (and its simulator) and the quarantine workers."""
+        self._feed_stop.set()
+        if self._feed is not None:
+            self._feed.join(timeout=5)
+        self.quarantine.stop()
+
+    def _threat_feed(self):
+        while not self._feed_stop.wait(FEED_INTERVAL):
+            self.feed_tick()
+
+    def _simulated_feed(self):
+        from src.simulator import ThreatSimulator
+
+        # Stopped from this thread, so no ring view is in use when the rings close
+        with ThreatSimulator(SIMULATOR_WORKERS) as sim:
+            while not self._feed_stop.is_set():
+                if not self.simulator_tick(sim):
+                    time.sleep(SIMULATOR_IDLE)
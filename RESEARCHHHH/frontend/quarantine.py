@@ -0,0 +1,294 @@
+import heapq
+import threading
+import time
+
+from src.metrics import QUARANTINE_DWELL_SECONDS, QUARANTINE_KILLS, QUARANTINE_OVERFLOW
+from src.threat_engine import ThreatEngine
+
+# Statuses a client may set on a queued threat
+QUARANTINE_STATUSES = ("active", "killed", "released")
+
+class QuarantineQueue:
+    """
+    Active threats in triage order: an indexed binary max-heap keyed on
+    score, with high-entropy payloads ahead of everything else and the
+    oldest first among equals. The index maps each threat id to its heap
+    slot, so re-scoring or removing a queued threat is O(log n) rather than
+    a re-sort of everything active.
+
+    A threat seen again under a queued id is re-scored, not queued twice.
+    """
+
+    def __init__(self, capacity=None, clock=time.time):
+        self.capacity = capacity
+        self.clock = clock
+        # Entries are [priority, threat, enqueued_at]; priority is
+        # (quarantine, score, -arrival), so no two compare equal
+        self.heap = []
+        self.index = {}
+        self._arrivals = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, threat_id):
+        return threat_id in self.index
+
+    def _priority(self, threat, arrival):
+        return (threat.entropy >= ThreatEngine.QUARANTINE_ENTROPY, threat.score, -arrival)
+
+    def push(self, threat):
+        """Queues a threat; returns False if the queue is full."""
+        return self.push_batch((threat,)) == 1
+
+    def push_batch(self, threats):
+        """
+        Queues many threats and returns how many were accepted. A batch
+        bigger than the heap is appended and heapified in O(n) instead of
+        sifted in one at a time.
+        """
+        heap, index = self.heap, self.index
+        now = self.clock()
+        start = len(heap)
+        accepted = 0
+        rescored = []
+        for threat in threats:
+            at = index.get(threat.id)
+            if at is not None:
+                score = max(heap[at][1].score, threat.score)
+                if at < start:
+                    # Re-sifted once the new entries are in place
+                    rescored.append((threat.id, score))
+                else:
+                    entry = heap[at]
+                    entry[1].score = score
+                    entry[0] = (entry[0][0], score, entry[0][2])
+                accepted += 1
+                continue
+            if self.capacity is not None and len(heap) >= self.capacity:
+                continue
+            self._arrivals += 1
+            index[threat.id] = len(heap)
+            heap.append([self._priority(threat, self._arrivals), threat, now])
+            accepted += 1
+        added = len(heap) - start
+        if added > start:
+            for i in range(len(heap) // 2 - 1, -1, -1):
+                self._sift_down(i)
+        else:
+            for i in range(start, len(heap)):
+                self._sift_up(i)
+        for threat_id, score in rescored:
+            self.update(threat_id, score)
+        return accepted
+
+    def update(self, threat_id, score):
+        """Re-scores a queued threat in place; returns it, or None if it isn't queued."""
+        i = self.index.get(threat_id)
+        if i is None:
+            return None
+        entry = self.heap[i]
+        threat = entry[1]
+        threat.score = score
+        old = entry[0]
+        entry[0] = (old[0], score, old[2])
+        if entry[0] > old:
+            self._sift_up(i)
+        else:
+            self._sift_down(i)
+        return threat
+
+    def pop(self):
+        """Removes the highest-risk threat; returns (threat, dwell seconds) or None if empty."""
+        if not self.heap:
+            return None
+        return self._remove_at(0)
+
+    def remove(self, threat_id):
+        """Removes a queued threat; returns (threat, dwell seconds) or None if it isn't queued."""
+        i = self.index.get(threat_id)
+        if i is None:
+            return None
+        return self._remove_at(i)
+
+    def top(self, n):
+        """The n highest-risk threats, without dequeuing them."""
+        return [entry[1] for entry in heapq.nlargest(n, self.heap, key=lambda entry: entry[0])]
+
+    def _remove_at(self, i):
+        heap, index = self.heap, self.index
+        entry = heap[i]
+        del index[entry[1].id]
+        last = heap.pop()
+        if i < len(heap):
+            heap[i] = last
+            index[last[1].id] = i
+            if last[0] > entry[0]:
+                self._sift_up(i)
+            else:
+                self._sift_down(i)
+        return entry[1], self.clock() - entry[2]
+
+    def _sift_up(self, i):
+        heap, index = self.heap, self.index
+        entry = heap[i]
+        priority = entry[0]
+        while i:
+            parent = (i - 1) >> 1
+            above = heap[parent]
+            if above[0] > priority:
+                break
+            heap[i] = above
+            index[above[1].id] = i
+            i = parent
+        heap[i] = entry
+        index[entry[1].id] = i
+
+    def _sift_down(self, i):
+        heap, index = self.heap, self.index
+        n = len(heap)
+        entry = heap[i]
+        priority = entry[0]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            right = child + 1
+            if right < n and heap[right][0] > heap[child][0]:
+                child = right
+            below = heap[child]
+            if below[0] < priority:
+                break
+            heap[i] = below
+            index[below[1].id] = i
+            i = child
+        heap[i] = entry
+        index[entry[1].id] = i
+
+class QuarantineScheduler:
+    """
+    Neutralizes quarantined threats on the server. Each worker thread pops
+    the highest-risk threat, marks it killed and compiles its rule through
+    the pipeline, which counts the kill and streams the rule. interval
+    paces each worker to one kill per interval seconds; 0 kills as fast as
+    threats arrive.
+    """
+
+    def __init__(self, pipeline, workers=1, interval=0.0, capacity=None, clock=time.time):
+        self.pipeline = pipeline
+        self.workers = workers
+        self.interval = interval
+        self.queue = QuarantineQueue(capacity, clock)
+        self.cond = threading.Condition()
+        self.killed = 0
+        self.released = 0
+        self.overflow = 0
+        self.dwell_total = 0.0
+        self.last_dwell = None
+        self._threads = []
+        self._stopping = False
+
+    def submit(self, threats):
+        """Queues newly collected threats; those that don't fit are counted as overflow."""
+        threats = list(threats)
+        with self.cond:
+            accepted = self.queue.push_batch(threats)
+            self.overflow += len(threats) - accepted
+            self.cond.notify_all()
+        if accepted < len(threats):
+            QUARANTINE_OVERFLOW.inc(len(threats) - accepted)
+        return accepted
+
+    def discard(self, threats):
+        """Drops threats that were neutralized elsewhere, e.g. compiled through the API."""
+        with self.cond:
+            if self.queue.index:
+                for threat in threats:
+                    self.queue.remove(threat.id)
+
+    def update(self, threat_id, score=None, status=None):
+        """
+        Re-scores a queued threat and/or sets its status: "killed"
+        neutralizes it now, out of turn, and "released" drops it without a
+        rule. Returns the threat, or None if it isn't queued.
+        """
+        if status is not None and status not in QUARANTINE_STATUSES:
+            raise ValueError(f"status must be one of {', '.join(QUARANTINE_STATUSES)}")
+        with self.cond:
+            if threat_id not in self.queue:
+                return None
+            if score is not None:
+                self.queue.update(threat_id, score)
+            if status in (None, "active"):
+                return self.queue.heap[self.queue.index[threat_id]][1]
+            threat, dwell = self.queue.remove(threat_id)
+            if status == "released":
+                threat.status = "released"
+                self.released += 1
+                return threat
+        self._neutralize(threat, dwell)
+        return threat
+
+    def kill_next(self):
+        """Neutralizes the highest-risk queued threat; returns it, or None if the queue is empty."""
+        with self.cond:
+            popped = self.queue.pop()
+        if popped is None:
+            return None
+        self._neutralize(*popped)
+        return popped[0]
+
+    def _neutralize(self, threat, dwell):
+        threat.status = "killed"
+        self.pipeline.compile(threat)
+        with self.cond:
+            self.killed += 1
+            self.dwell_total += dwell
+            self.last_dwell = dwell
+            depth = len(self.queue)
+        QUARANTINE_KILLS.inc()
+        QUARANTINE_DWELL_SECONDS.observe(dwell)
+        self.pipeline.publish_kill(threat, dwell, depth)
+
+    def snapshot(self, top=0):
+        """Queue depth, kill counts and dwell times, plus the top queued threats."""
+        with self.cond:
+            return {
+                "depth": len(self.queue),
+                "capacity": self.queue.capacity,
+                "killed": self.killed,
+                "released": self.released,
+                "overflow": self.overflow,
+                "mean_dwell": self.dwell_total / self.killed if self.killed else None,
+                "last_dwell": self.last_dwell,
+                "top": self.queue.top(top) if top else [],
+            }
+
+    def start(self):
+        with self.cond:
+            if self._threads:
+                return
+            self._stopping = False
+            self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        with self.cond:
+            self._stopping = True
+            self.cond.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join()
+
+    def _work(self):
+        while True:
+            with self.cond:
+                while not self.queue and not self._stopping:
+                    self.cond.wait()
+                if self._stopping:
+                    return
+            self.kill_next()
+            if self.interval:
+                with self.cond:
+                    self.cond.wait_for(lambda: self._stopping, self.interval)
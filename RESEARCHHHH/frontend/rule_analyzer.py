@@ -0,0 +1,469 @@
+"""
+Conflict and shadowing analysis for a rule policy.
+
+A rule matches a source block (a CIDR), a threat type (or any type) and a
+signature prefix, and the highest-priority matching rule wins. A rule
+wholly covered by one that wins before it never fires: it is shadowed if
+the covering rule's action differs, redundant if it is the same. Rules
+that only partly overlap with a different action are reported too, since
+priority alone decides between them. Minimizing drops every rule that
+never fires, which leaves the policy's decisions unchanged.
+
+Analyze or minimize an exported policy (JSON or NDJSON, as served by
+/api/rules/export; source_ip may be a CIDR and type "*"):
+
+    python -m src.rule_analyzer policy.ndjson
+    python -m src.rule_analyzer policy.ndjson --minimize > pruned.ndjson
+"""
+import argparse
+import json
+import sys
+from bisect import bisect_left
+
+from src.cidr_table import ip_to_int
+from src.rule_store import TYPE_CODES
+
+# How rule a's match set compares to rule b's, per dimension and overall
+DISJOINT, EQUAL, WIDER, NARROWER, OVERLAP = range(5)
+
+# ip_keys pack (network, prefix length, uid) into one int: uid in the low bits
+UID_BITS = 40
+
+def _mask(prefix_len):
+    return (0xFFFFFFFF << (32 - prefix_len)) & 0xFFFFFFFF
+
+def _after_prefix(prefix):
+    # The smallest byte string above every string starting with prefix, or
+    # None if there is none
+    prefix = prefix.rstrip(b'\xff')
+    if not prefix:
+        return None
+    return prefix[:-1] + bytes((prefix[-1] + 1,))
+
+def _ip_relation(a, b):
+    if (a.net ^ b.net) & _mask(min(a.plen, b.plen)):
+        return DISJOINT
+    if a.plen == b.plen:
+        return EQUAL
+    return WIDER if a.plen < b.plen else NARROWER
+
+def _type_relation(a, b):
+    if a.type_code == b.type_code:
+        return EQUAL
+    if a.type_code is None:
+        return WIDER
+    if b.type_code is None:
+        return NARROWER
+    return DISJOINT
+
+def _fragment_relation(a, b):
+    if len(a.fragment) == len(b.fragment):
+        return EQUAL if a.fragment == b.fragment else DISJOINT
+    if len(a.fragment) < len(b.fragment):
+        return WIDER if b.fragment.startswith(a.fragment) else DISJOINT
+    return NARROWER if a.fragment.startswith(b.fragment) else DISJOINT
+
+def _relation(a, b):
+    """
+    How a's match set compares to b's. Along each dimension two matches
+    are either nested or disjoint, so a and b intersect only if they do in
+    all three; they partly OVERLAP when a is wider in one and narrower in
+    another.
+    """
+    relations = (_ip_relation(a, b), _type_relation(a, b), _fragment_relation(a, b))
+    if DISJOINT in relations:
+        return DISJOINT
+    combined = EQUAL
+    for rel in relations:
+        if rel != EQUAL:
+            if combined == EQUAL:
+                combined = rel
+            elif combined != rel:
+                return OVERLAP
+    return combined
+
+class _Entry:
+    __slots__ = ("handle", "label", "uid", "net", "plen", "type_code", "fragment", "action",
+                 "rank", "covered_by", "covers", "overlaps")
+
+    def __init__(self, handle, label, uid, net, plen, type_code, fragment, action, rank):
+        self.handle = handle
+        self.label = label
+        self.uid = uid
+        self.net = net
+        self.plen = plen
+        self.type_code = type_code
+        self.fragment = fragment
+        self.action = action
+        # Lower ranks win: higher priority first, then the older rule
+        self.rank = rank
+        # Sets of entries, created on first use; most rules have no findings
+        self.covered_by = None
+        self.covers = None
+        self.overlaps = None
+
+def _bucket_add(buckets, key, entry):
+    # A bucket holding one entry stores it bare; that is the common case
+    bucket = buckets.get(key)
+    if bucket is None:
+        buckets[key] = entry
+    elif isinstance(bucket, set):
+        bucket.add(entry)
+    else:
+        buckets[key] = {bucket, entry}
+
+def _bucket_discard(buckets, key, entry):
+    bucket = buckets[key]
+    if not isinstance(bucket, set):
+        del buckets[key]
+        return
+    bucket.discard(entry)
+    if len(bucket) == 1:
+        buckets[key] = next(iter(bucket))
+
+def _bucket_entries(bucket):
+    return bucket if isinstance(bucket, set) else (bucket,)
+
+class PolicyAnalyzer:
+    """
+    Incremental shadowing, redundancy and overlap analysis.
+
+    Each added rule is only compared with the rules it intersects. Those
+    are found through two indexes, and the more selective one is walked:
+    - Source blocks. Wider blocks are found by one hash probe per prefix
+      length in use. Narrower ones are a range of a sorted list of packed
+      (network, prefix length) keys.
+    - Signature fragments. Shorter prefixes are found by one probe per
+      fragment length in use. Longer ones are a range of the sorted
+      fragments.
+    An insert or removal costs a few probes plus the rules it actually
+    intersects, not a pass over the policy.
+
+    The sorted lists are only needed for the narrower and longer lookups.
+    Appends leave them unsorted and removals leave dead keys behind, and
+    both are settled on the next range lookup. A policy of single-IP,
+    full-fragment rules, like the forge compiles, never pays for them.
+
+    Rules are identified by a caller-chosen handle, and findings name them
+    by label.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.by_uid = {}
+        self._next_uid = 0
+        # (network, prefix length) -> entries, and prefix length -> count
+        self.by_block = {}
+        self.block_lengths = {}
+        # fragment -> entries, and fragment length -> count
+        self.by_fragment = {}
+        self.fragment_lengths = {}
+        # Packed source keys and (fragment, uid) pairs, sorted on demand
+        self.ip_keys = []
+        self.fragment_keys = []
+        self._keys_sorted = True
+        self._dead_keys = 0
+        # Entries with a finding, kept so reports don't walk the policy
+        self.covered = set()
+        self.overlapping = set()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, handle):
+        return handle in self.entries
+
+    def add(self, handle, label, net, plen, type_code, fragment, priority, action, created_at=0.0):
+        """
+        Adds a rule matching net/plen, type_code (None for any type) and
+        the signature prefix fragment. A handle already present is replaced.
+        """
+        if handle in self.entries:
+            self.remove(handle)
+        entry = self._entry(handle, label, net, plen, type_code, fragment, priority, action, created_at)
+        for other in self._candidates(entry):
+            self._relate(entry, other)
+        self._index(entry)
+
+    def add_many(self, rules):
+        """
+        add() over many argument tuples. Every rule is indexed first and
+        then related to the ones indexed before it, which sorts the lookup
+        lists once rather than on every insert.
+        """
+        added = []
+        for rule in rules:
+            if rule[0] in self.entries:
+                self.remove(rule[0])
+            entry = self._entry(*rule)
+            self._index(entry)
+            added.append(entry)
+        for entry in added:
+            if entry.uid not in self.by_uid:
+                continue
+            for other in self._candidates(entry):
+                if other.uid < entry.uid:
+                    self._relate(entry, other)
+
+    def _entry(self, handle, label, net, plen, type_code, fragment, priority, action, created_at=0.0):
+        uid = self._next_uid
+        self._next_uid += 1
+        return _Entry(handle, label, uid, net & _mask(plen), plen, type_code, bytes(fragment),
+                      action, (-priority, created_at, uid))
+
+    def _index(self, entry):
+        self.entries[entry.handle] = entry
+        self.by_uid[entry.uid] = entry
+        _bucket_add(self.by_block, (entry.net, entry.plen), entry)
+        self.block_lengths[entry.plen] = self.block_lengths.get(entry.plen, 0) + 1
+        _bucket_add(self.by_fragment, entry.fragment, entry)
+        length = len(entry.fragment)
+        self.fragment_lengths[length] = self.fragment_lengths.get(length, 0) + 1
+        self.ip_keys.append((entry.net << 6 | entry.plen) << UID_BITS | entry.uid)
+        self.fragment_keys.append((entry.fragment, entry.uid))
+        self._keys_sorted = False
+
+    def remove(self, handle):
+        """Drops a rule and every finding that involves it; unknown handles are ignored."""
+        entry = self.entries.pop(handle, None)
+        if entry is None:
+            return
+        del self.by_uid[entry.uid]
+        for covered in entry.covers or ():
+            covered.covered_by.discard(entry)
+            if not covered.covered_by:
+                self.covered.discard(covered)
+        for cover in entry.covered_by or ():
+            cover.covers.discard(entry)
+        for other in entry.overlaps or ():
+            other.overlaps.discard(entry)
+            if not other.overlaps:
+                self.overlapping.discard(other)
+        self.covered.discard(entry)
+        self.overlapping.discard(entry)
+
+        _bucket_discard(self.by_block, (entry.net, entry.plen), entry)
+        self._count_down(self.block_lengths, entry.plen)
+        _bucket_discard(self.by_fragment, entry.fragment, entry)
+        self._count_down(self.fragment_lengths, len(entry.fragment))
+        # Its keys stay in the sorted lists until there are as many dead as live
+        self._dead_keys += 1
+        if self._dead_keys > len(self.entries):
+            self._drop_dead_keys()
+
+    @staticmethod
+    def _count_down(lengths, length):
+        lengths[length] -= 1
+        if not lengths[length]:
+            del lengths[length]
+
+    def _drop_dead_keys(self):
+        # Filtering keeps the lists' order, sorted or not
+        by_uid = self.by_uid
+        uid_mask = (1 << UID_BITS) - 1
+        self.ip_keys = [key for key in self.ip_keys if key & uid_mask in by_uid]
+        self.fragment_keys = [key for key in self.fragment_keys if key[1] in by_uid]
+        self._dead_keys = 0
+
+    def _sort_keys(self):
+        if not self._keys_sorted:
+            self.ip_keys.sort()
+            self.fragment_keys.sort()
+            self._keys_sorted = True
+
+    def _candidates(self, entry):
+        # Every indexed entry that may intersect entry, walking whichever of
+        # the source and fragment indexes yields fewer. Range counts include
+        # dead keys, which is close enough to pick a side.
+        wider_blocks = [self.by_block.get((entry.net & _mask(length), length))
+                        for length in self.block_lengths if length <= entry.plen]
+        wider_blocks = [_bucket_entries(bucket) for bucket in wider_blocks if bucket is not None]
+        ip_lo = ip_hi = 0
+        if any(length > entry.plen for length in self.block_lengths):
+            self._sort_keys()
+            ip_lo = bisect_left(self.ip_keys, entry.net << (6 + UID_BITS))
+            ip_hi = bisect_left(self.ip_keys, (entry.net + (1 << (32 - entry.plen))) << (6 + UID_BITS))
+        ip_count = sum(map(len, wider_blocks)) + ip_hi - ip_lo
+
+        fragment = entry.fragment
+        shorter = [self.by_fragment.get(fragment[:length])
+                   for length in self.fragment_lengths if length <= len(fragment)]
+        shorter = [_bucket_entries(bucket) for bucket in shorter if bucket is not None]
+        frag_lo = frag_hi = 0
+        if any(length > len(fragment) for length in self.fragment_lengths):
+            self._sort_keys()
+            frag_lo = bisect_left(self.fragment_keys, (fragment,))
+            after = _after_prefix(fragment)
+            frag_hi = len(self.fragment_keys) if after is None else bisect_left(self.fragment_keys, (after,))
+        fragment_count = sum(map(len, shorter)) + frag_hi - frag_lo
+
+        by_uid = self.by_uid
+        if ip_count <= fragment_count:
+            for bucket in wider_blocks:
+                yield from bucket
+            uid_mask = (1 << UID_BITS) - 1
+            for key in self.ip_keys[ip_lo:ip_hi]:
+                other = by_uid.get(key & uid_mask)
+                if other is not None and other.plen > entry.plen:
+                    yield other
+        else:
+            for bucket in shorter:
+                yield from bucket
+            for other_fragment, uid in self.fragment_keys[frag_lo:frag_hi]:
+                other = by_uid.get(uid)
+                if other is not None and len(other_fragment) > len(fragment):
+                    yield other
+
+    def _relate(self, entry, other):
+        rel = _relation(entry, other)
+        if rel == DISJOINT:
+            return
+        if rel == OVERLAP:
+            if entry.action != other.action:
+                self._link_overlap(entry, other)
+            return
+        # A rule covered by one that wins before it never fires; a narrower
+        # rule that wins first is an exception to the wider one, not a finding
+        if rel in (EQUAL, NARROWER) and other.rank < entry.rank:
+            self._link_cover(other, entry)
+        elif rel in (EQUAL, WIDER) and entry.rank < other.rank:
+            self._link_cover(entry, other)
+
+    def _link_cover(self, cover, covered):
+        if cover.covers is None:
+            cover.covers = set()
+        cover.covers.add(covered)
+        if covered.covered_by is None:
+            covered.covered_by = set()
+        covered.covered_by.add(cover)
+        self.covered.add(covered)
+
+    def _link_overlap(self, a, b):
+        for entry, other in ((a, b), (b, a)):
+            if entry.overlaps is None:
+                entry.overlaps = set()
+            entry.overlaps.add(other)
+            self.overlapping.add(entry)
+
+    def is_covered(self, handle):
+        """Whether the rule never fires: it is shadowed or redundant."""
+        entry = self.entries.get(handle)
+        return entry is not None and entry in self.covered
+
+    def kind(self, handle):
+        """The rule's finding: shadowed, redundant, overlapping or None."""
+        entry = self.entries.get(handle)
+        if entry is None:
+            return None
+        if entry in self.covered:
+            return self._cover_kind(entry)
+        return "overlapping" if entry in self.overlapping else None
+
+    @staticmethod
+    def _cover_kind(entry):
+        if any(cover.action != entry.action for cover in entry.covered_by):
+            return "shadowed"
+        return "redundant"
+
+    def effective(self):
+        """Handles of the rules that can fire, i.e. the minimized policy."""
+        return [handle for handle, entry in self.entries.items() if entry not in self.covered]
+
+    def report(self, limit=100):
+        """
+        Finding counts and up to limit findings, highest-priority rules
+        first. A covered rule names the first rule that wins over it and
+        how many do; an overlapping one the rules it conflicts with.
+        """
+        counts = {"shadowed": 0, "redundant": 0}
+        for entry in self.covered:
+            counts[self._cover_kind(entry)] += 1
+        findings = []
+        for entry in sorted(self.covered, key=lambda entry: entry.rank)[:limit]:
+            first = min(entry.covered_by, key=lambda cover: cover.rank)
+            findings.append({"rule": entry.label, "kind": self._cover_kind(entry),
+                             "by": first.label, "covering": len(entry.covered_by)})
+        overlapping = sorted(self.overlapping - self.covered, key=lambda entry: entry.rank)
+        for entry in overlapping[:max(0, limit - len(findings))]:
+            findings.append({"rule": entry.label, "kind": "overlapping",
+                             "with": sorted(other.label for other in entry.overlaps)})
+        return {
+            "rules": len(self.entries),
+            "effective": len(self.entries) - len(self.covered),
+            "shadowed": counts["shadowed"],
+            "redundant": counts["redundant"],
+            "overlapping": len(overlapping),
+            "findings": findings,
+        }
+
+def rule_match(rule):
+    """
+    (net, plen, type_code, fragment) for a rule dict in the policy fabric
+    layout. source_ip may be a CIDR block and type "*" for any type; a
+    missing field matches anything.
+    """
+    match = rule["match"]
+    ip, _, plen = match.get("source_ip", "0.0.0.0/0").partition('/')
+    plen = int(plen) if plen else 32
+    if not 0 <= plen <= 32:
+        raise ValueError(f"bad prefix length in {match['source_ip']!r}")
+    threat_type = match.get("type", "*")
+    type_code = None if threat_type == "*" else TYPE_CODES[threat_type]
+    signature = match.get("signature")
+    # Signatures are SIG_<fragment hex>_<tag>
+    fragment = bytes.fromhex(signature.split('_')[1]) if signature else b""
+    return ip_to_int(ip) & _mask(plen), plen, type_code, fragment
+
+def analyze_rules(rules):
+    """A PolicyAnalyzer over rule dicts, each handled by its position."""
+    analyzer = PolicyAnalyzer()
+    analyzer.add_many((i, rule.get("rule_id", str(i)), *rule_match(rule), rule.get("priority", 0),
+                       rule.get("action", "DROP"), rule.get("created_at", 0.0))
+                      for i, rule in enumerate(rules))
+    return analyzer
+
+def load_policy(f):
+    """Rule dicts from a JSON export ({"rules": [...]} or a list) or NDJSON; returns (rules, is_ndjson)."""
+    text = f.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        return data["rules"], False
+    if isinstance(data, list):
+        return data, False
+    # NDJSON; a paged export ends with a next_cursor line
+    rules = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return [rule for rule in rules if "match" in rule], True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find shadowed, redundant and overlapping rules in a policy.")
+    parser.add_argument("path", help="policy export, JSON or NDJSON ('-' for stdin)")
+    parser.add_argument("--minimize", action="store_true",
+                        help="write the policy without the rules that never fire")
+    parser.add_argument("--limit", type=int, default=100, help="findings to list")
+    args = parser.parse_args(argv)
+
+    if args.path == "-":
+        rules, ndjson = load_policy(sys.stdin)
+    else:
+        with open(args.path) as f:
+            rules, ndjson = load_policy(f)
+    analyzer = analyze_rules(rules)
+
+    if not args.minimize:
+        json.dump(analyzer.report(args.limit), sys.stdout, indent=2)
+        print()
+        return
+    pruned = [rules[i] for i in sorted(analyzer.effective())]
+    if ndjson:
+        for rule in pruned:
+            print(json.dumps(rule, separators=(",", ":")))
+    else:
+        json.dump({"rules": pruned}, sys.stdout, separators=(",", ":"))
+        print()
+    print(f"{len(rules) - len(pruned):,} of {len(rules):,} rules pruned", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import mmap
+import os
+import struct
+
+MAGIC = b'GGRS'
+VERSION = 1
+# magic, version, signature width, record count
+HEADER = struct.Struct('>4sHHI')
+
+class RuleFile:
+    """
+    On-disk rule store: a fixed-record snapshot that is memory-mapped at
+    startup, plus an append-only log of rules written since that snapshot.
+
+    Snapshot records are sorted by their (source_ip, type, signature) key,
+    so a lookup is a binary search over the mapping and nothing has to be
+    deserialized up front. Hit counters, last-seen times and the alive flag
+    of snapshot records are updated in place. The log is replayed at
+    startup and folded into a fresh snapshot by write_snapshot().
+
+    A record is (source_ip, type_code, signature, rule_tag, sig_tag,
+    priority, action_code, alive, created_at, last_seen, hits); the log
+    repeats a record whenever it changes, and the latest copy wins.
+    """
+
+    def __init__(self, path, sig_bytes):
+        self.path = path
+        self.sig_bytes = sig_bytes
+        self.key = struct.Struct(f'>IB{sig_bytes}s')
+        self.record = struct.Struct(f'>IB{sig_bytes}sHHHBBddI')
+        # Offsets of the fields updated in place
+        self._alive_at = struct.calcsize(f'>IB{sig_bytes}sHHHB')
+        self._seen_at = struct.calcsize(f'>IB{sig_bytes}sHHHBBd')
+        self._file = None
+        self._map = None
+        self.count = 0
+        self._open_snapshot()
+        self.log = open(path + '.log', 'ab')
+        self.log_records = os.path.getsize(path + '.log') // self.record.size
+
+    def _open_snapshot(self):
+        dat = self.path + '.dat'
+        if not os.path.exists(dat):
+            return
+        self._file = open(dat, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, version, sig_bytes, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or sig_bytes != self.sig_bytes:
+            raise ValueError(f"{dat} is not a version {VERSION} rule snapshot with {self.sig_bytes}-byte signatures")
+        self.count = count
+
+    def _close_snapshot(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._file = self._map = None
+        self.count = 0
+
+    def close(self):
+        self.log.close()
+        if self._map is not None:
+            self._map.flush()
+        self._close_snapshot()
+
+    def _offset(self, i):
+        return HEADER.size + i * self.record.size
+
+    def find(self, src, type_code, fragment):
+        """Index of the snapshot record with this key, or -1."""
+        if self._map is None:
+            return -1
+        key = self.key.pack(src, type_code, fragment)
+        width = self.key.size
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = self._offset(mid)
+            if self._map[offset:offset + width] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count:
+            offset = self._offset(lo)
+            if self._map[offset:offset + width] == key:
+                return lo
+        return -1
+
+    def read(self, i):
+        return self.record.unpack_from(self._map, self._offset(i))
+
+    def touch(self, i, now):
+        offset = self._offset(i)
+        hits = struct.unpack_from('>I', self._map, offset + self._seen_at + 8)[0]
+        struct.pack_into('>dI', self._map, offset + self._seen_at, now, hits + 1)
+
+    def delete(self, i):
+        self._map[self._offset(i) + self._alive_at] = 0
+
+    def __iter__(self):
+        """Yields every snapshot record, dead ones included."""
+        if self._map is None:
+            return
+        yield from self.record.iter_unpack(self._map[HEADER.size:self._offset(self.count)])
+
+    def append(self, record):
+        self.log.write(self.record.pack(*record))
+        self.log_records += 1
+
+    def flush(self):
+        self.log.flush()
+
+    def replay_log(self):
+        """Yields logged records in write order; a torn final record is ignored."""
+        self.log.flush()
+        with open(self.path + '.log', 'rb') as f:
+            data = f.read()
+        usable = len(data) - len(data) % self.record.size
+        yield from self.record.iter_unpack(data[:usable])
+
+    def write_snapshot(self, records):
+        """
+        Atomically replaces the snapshot with records (already sorted by key)
+        and truncates the log.
+        """
+        tmp = self.path + '.dat.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.sig_bytes, len(records)))
+            pack = self.record.pack
+            f.write(b''.join(pack(*record) for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._close_snapshot()
+        os.replace(tmp, self.path + '.dat')
+        self._open_snapshot()
+
+        self.log.close()
+        self.log = open(self.path + '.log', 'wb')
+        self.log_records = 0
@@ -1,33 +1,457 @@
-import uuid
-
-class RuleForge:
-    def __init__(self):
-        self.rules_db = []
-
-    def compile_rule(self, threat_data):
-        """
-        Takes a neutralized threat and compiles a firewall rule 
-        to prevent future occurrences.
-        """
-        # Generate a unique signature from the payload fragment
-        sig_fragment = threat_data['payload'][:12].replace(' ', '').upper()
-        signature = f"SIG_{sig_fragment}_{uuid.uuid4().hex[:4].upper()}"
-
-        rule = {
-            "rule_id": f"R-{uuid.uuid4().hex[:4].upper()}",
-            "match": {
-                "type": threat_data['type'],
-                "signature": signature,
-                "source_ip": threat_data['src']
-            },
-            "action": "DROP",
-            "priority": random.randint(100, 999),
-            "created_at": "timestamp_now"
-        }
-        
-        self.rules_db.append(rule)
-        return rule
-
-    def export_rules_json(self):
-        """Returns the current policy fabric as JSON."""
-        return self.rules_db
\ No newline at end of file
+import heapq
+import random
+import threading
+import time
+import uuid
+
+from src.cidr_table import CidrTable, ip_to_int
+from src.metrics import COMPILE_BATCH_SECONDS, COMPILE_SECONDS, RULES_COMPILED, timed
+from src.rule_file import RuleFile
+from src.rule_index import RuleIndex
+from src.rule_store import TYPE_CODES, Rule, RuleStore
+from src.sig_scanner import SignatureScanner
+
+class RuleForge:
+    # Number of leading payload bytes that make up a rule signature
+    SIG_BYTES = 4
+    # Compiled rules get a priority up to this; it scales how long they are kept
+    MAX_PRIORITY = 999
+    # Idle time that ages out a top-priority rule, used to rank rules for
+    # eviction when there is no rule_ttl
+    AGE_SCALE = 3600.0
+    # Dead in-memory rows tolerated before the store is rebuilt from the live ones
+    MIN_DEAD_ROWS = 1024
+
+    def __init__(self, max_rules=None, rule_ttl=None, path=None, compact_every=100000):
+        """
+        Rules age by priority and last hit: a rule may sit idle for
+        rule_ttl * priority / MAX_PRIORITY seconds before it expires, so
+        high-priority rules outlive low-priority ones hit at the same time.
+        max_rules caps the active policy, evicting the most aged rule.
+
+        With a path, the policy persists in a RuleFile (<path>.dat snapshot
+        and <path>.log). Rules from the snapshot are served straight from
+        the memory map; rules compiled since live in memory and the log,
+        which is folded into a new snapshot every compact_every log records.
+        Snapshot rules are bounded by max_rules and rule_ttl at compaction.
+        """
+        self.max_rules = max_rules
+        self.rule_ttl = rule_ttl
+        self.age_scale = self.AGE_SCALE if rule_ttl is None else rule_ttl
+        self.compact_every = compact_every
+        # Guards the store and its indexes; handlers may run on several threads
+        self.lock = threading.RLock()
+        self._reset_memory()
+
+        # Bumped by compact(); export cursors from an older generation are stale
+        self.generation = 0
+        self.disk = None
+        if path is not None:
+            self.disk = RuleFile(path, self.SIG_BYTES)
+            self._replay_log()
+
+    def _reset_memory(self):
+        self.rules_db = RuleStore(self.SIG_BYTES)
+        self.index = RuleIndex(self.rules_db)
+        # Match key -> row
+        self.cache = {}
+        # (aging deadline, row) min-heap; deadlines only move later, so
+        # entries are refreshed lazily when they reach the top
+        self.aging = []
+        # Built on first use, so a cold start doesn't walk the snapshot
+        self._cidr = None
+        self._scanner = None
+        self._analyzer = None
+
+    @timed(COMPILE_SECONDS)
+    def compile_rule(self, threat_data):
+        """
+        Takes a neutralized threat and compiles a firewall rule 
+        to prevent future occurrences.
+
+        A threat with the same type, source IP and signature fragment as an
+        existing rule returns that rule with its hit counter bumped.
+        """
+        RULES_COMPILED.inc()
+        with self.lock:
+            rule = self._compile(threat_data, time.time())
+            self._sync()
+            return rule
+
+    @timed(COMPILE_BATCH_SECONDS)
+    def compile_batch(self, threats):
+        """compile_rule() over many threats, taking the store lock once."""
+        now = time.time()
+        with self.lock:
+            rules = [self._compile(threat, now) for threat in threats]
+            self._sync()
+        RULES_COMPILED.inc(len(rules))
+        return rules
+
+    def match_key(self, threat_data):
+        """The normalized (type, source_ip, signature fragment) tuple, packed into one int."""
+        return self._key(threat_data.src, TYPE_CODES[threat_data.type],
+                         bytes(threat_data.payload[:self.SIG_BYTES]))
+
+    @staticmethod
+    def _key(src, type_code, fragment):
+        return (int.from_bytes(fragment, 'big') << 32 | src) << 8 | type_code
+
+    def _compile(self, threat_data, now):
+        self.expire(now)
+        type_code = TYPE_CODES[threat_data.type]
+        fragment = bytes(threat_data.payload[:self.SIG_BYTES])
+        key = self._key(threat_data.src, type_code, fragment)
+        row = self.cache.get(key)
+        if row is not None:
+            self.rules_db.touch(row, now)
+            self._log(row)
+            return self.rules_db.get(row)
+
+        if self.disk is not None:
+            i = self.disk.find(threat_data.src, type_code, fragment)
+            if i >= 0 and self._disk_live(i, now):
+                self.disk.touch(i, now)
+                return RuleStore.record_to_rule(self.disk.read(i))
+
+        # Make room first, so a new rule is never the one evicted
+        if self.max_rules is not None and len(self.cache) >= self.max_rules:
+            row = self._pop_aged(float('inf'))
+            if row is not None:
+                self._evict(row)
+        rule = self._build_rule(threat_data, now)
+        row = self.cache[key] = self._insert(rule)
+        self._log(row)
+        return rule
+
+    def _disk_live(self, i, now):
+        # Snapshot rules past their TTL are retired here rather than served
+        record = self.disk.read(i)
+        if not record[7]:
+            return False
+        if self.rule_ttl is not None and self.deadline(record[9], record[5]) <= now:
+            self.disk.delete(i)
+            if self._cidr is not None:
+                self._cidr.remove(record[0], RuleStore.ACTIONS[record[6]])
+            if self._scanner is not None:
+                self._scanner.remove(record[2], f"R-{record[3]:04X}")
+            if self._analyzer is not None:
+                self._analyzer.remove(self._key(*record[:3]))
+            return False
+        return True
+
+    def deadline(self, last_seen, priority):
+        """When a rule last hit at last_seen ages out."""
+        return last_seen + self.age_scale * priority / self.MAX_PRIORITY
+
+    def expire(self, now=None):
+        """Drops in-memory rules idle for longer than their priority allows."""
+        if self.rule_ttl is None:
+            return
+        now = time.time() if now is None else now
+        with self.lock:
+            while True:
+                row = self._pop_aged(now)
+                if row is None:
+                    break
+                self._evict(row)
+
+    def _track(self, row):
+        store = self.rules_db
+        heapq.heappush(self.aging, (self.deadline(store.last_seen[row], store.priority[row]), row))
+
+    def _pop_aged(self, now):
+        # Pops the most aged live row if its deadline is at or before now and
+        # drops its cache entry. Entries for dead rows are discarded; entries
+        # for rows hit since they were pushed go back with their new deadline.
+        aging = self.aging
+        store = self.rules_db
+        while aging and aging[0][0] <= now:
+            pushed, row = heapq.heappop(aging)
+            if not store.alive[row]:
+                continue
+            deadline = self.deadline(store.last_seen[row], store.priority[row])
+            if deadline != pushed:
+                heapq.heappush(aging, (deadline, row))
+                continue
+            del self.cache[self._key(store.source_ip[row], store.type_code[row],
+                                     store.signature_bytes(row))]
+            return row
+        return None
+
+    def _build_rule(self, threat_data, now):
+        # Generate a unique signature from the payload fragment
+        sig_fragment = threat_data.payload[:self.SIG_BYTES].hex().upper()
+        signature = f"SIG_{sig_fragment}_{uuid.uuid4().hex[:4].upper()}"
+
+        return Rule(
+            rule_id=f"R-{uuid.uuid4().hex[:4].upper()}",
+            type=threat_data.type,
+            signature=signature,
+            source_ip=threat_data.src,
+            action="DROP",
+            priority=random.randint(100, 999),
+            created_at=now
+        )
+
+    def _insert(self, rule):
+        row = self.rules_db.append(rule)
+        self._index_row(row)
+        self._track(row)
+        return row
+
+    def _index_row(self, row):
+        self.index.add(row)
+        store = self.rules_db
+        if self._cidr is not None:
+            self._cidr.insert(store.source_ip[row], 32, store.ACTIONS[store.action_code[row]])
+        if self._scanner is not None:
+            self._scanner.add(store.signature_bytes(row), f"R-{store.rule_tag[row]:04X}")
+        if self._analyzer is not None:
+            self._analyzer.add(*self._analyzer_rule(store.record(row)))
+
+    def _evict(self, row):
+        store = self.rules_db
+        self.index.remove(row)
+        if self._cidr is not None:
+            self._cidr.remove(store.source_ip[row], store.ACTIONS[store.action_code[row]])
+        if self._scanner is not None:
+            self._scanner.remove(store.signature_bytes(row), f"R-{store.rule_tag[row]:04X}")
+        if self._analyzer is not None:
+            self._analyzer.remove(self._key(store.source_ip[row], store.type_code[row],
+                                            store.signature_bytes(row)))
+        store.delete(row)
+        self._log(row)
+
+    def _log(self, row):
+        if self.disk is not None:
+            self.disk.append(self.rules_db.record(row))
+
+    def _sync(self):
+        store = self.rules_db
+        if len(store.alive) - len(store) > max(len(store), self.MIN_DEAD_ROWS):
+            self._compact_memory()
+        if self.disk is None:
+            return
+        if self.disk.log_records >= self.compact_every:
+            self.compact()
+        else:
+            self.disk.flush()
+
+    def _replay_log(self):
+        store = self.rules_db
+        for record in self.disk.replay_log():
+            src, type_code, fragment = record[:3]
+            key = self._key(src, type_code, fragment)
+            row = self.cache.get(key)
+            if row is None:
+                if record[7]:
+                    self.cache[key] = row = store.append_record(record)
+                    self.index.add(row)
+                    self._track(row)
+                continue
+
+            if not record[7]:
+                del self.cache[key]
+                self.index.remove(row)
+                store.delete(row)
+                continue
+            store.hits[row] = record[10]
+            store.last_seen[row] = record[9]
+
+    def _compact_memory(self):
+        # Evicted and expired rows stay in the store's arrays as dead rows;
+        # rebuild it from the live ones so memory tracks the live policy.
+        # Row numbers change, so export cursors are invalidated.
+        records = [self.rules_db.record(row) for row in self.cache.values()]
+        self._reset_memory()
+        store = self.rules_db
+        for record in records:
+            row = store.append_record(record)
+            self.cache[self._key(*record[:3])] = row
+            self.index.add(row)
+            self._track(row)
+        self.generation += 1
+
+    def compact(self):
+        """
+        Folds the log and in-memory rules into a fresh snapshot, dropping
+        dead and expired records and keeping at most max_rules of the least
+        aged ones.
+        """
+        if self.disk is None:
+            return
+        with self.lock:
+            now = time.time()
+            records = [record for record in self.disk if record[7]]
+            records += [self.rules_db.record(row) for row in self.cache.values()]
+            if self.rule_ttl is not None:
+                records = [record for record in records if self.deadline(record[9], record[5]) > now]
+            if self.max_rules is not None and len(records) > self.max_rules:
+                records.sort(key=lambda record: self.deadline(record[9], record[5]))
+                records = records[-self.max_rules:]
+            records.sort(key=lambda record: record[:3])
+
+            self.disk.write_snapshot(records)
+            self._reset_memory()
+            self.generation += 1
+
+    def close(self):
+        """Flushes and closes the on-disk store, if any."""
+        with self.lock:
+            if self.disk is not None:
+                self.disk.close()
+                self.disk = None
+
+    @property
+    def cidr(self):
+        """The aggregated source CIDR table, built on first use."""
+        with self.lock:
+            if self._cidr is None:
+                table = CidrTable()
+                actions = RuleStore.ACTIONS
+                if self.disk is not None:
+                    for record in self.disk:
+                        if record[7]:
+                            table.insert(record[0], 32, actions[record[6]])
+                store = self.rules_db
+                for row in self.cache.values():
+                    table.insert(store.source_ip[row], 32, actions[store.action_code[row]])
+                self._cidr = table
+            return self._cidr
+
+    @property
+    def scanner(self):
+        """The signature scanner over every live rule, built on first use."""
+        with self.lock:
+            if self._scanner is None:
+                scanner = SignatureScanner()
+                if self.disk is not None:
+                    for record in self.disk:
+                        if record[7]:
+                            scanner.add(record[2], f"R-{record[3]:04X}")
+                store = self.rules_db
+                for row in self.cache.values():
+                    scanner.add(store.signature_bytes(row), f"R-{store.rule_tag[row]:04X}")
+                scanner.fold()
+                self._scanner = scanner
+            return self._scanner
+
+    @property
+    def analyzer(self):
+        """The shadowing and redundancy analysis of every live rule, built on first use."""
+        with self.lock:
+            if self._analyzer is None:
+                # Imported here: most processes never analyze the policy
+                from src.rule_analyzer import PolicyAnalyzer
+
+                analyzer = PolicyAnalyzer()
+                if self.disk is not None:
+                    analyzer.add_many(self._analyzer_rule(record) for record in self.disk if record[7])
+                store = self.rules_db
+                analyzer.add_many(self._analyzer_rule(store.record(row)) for row in self.cache.values())
+                self._analyzer = analyzer
+            return self._analyzer
+
+    def _analyzer_rule(self, record):
+        # Compiled rules match one source IP, their type and the whole fragment
+        source_ip, type_code, fragment, rule_tag = record[:4]
+        return (self._key(source_ip, type_code, fragment), f"R-{rule_tag:04X}", source_ip, 32,
+                type_code, fragment, record[5], RuleStore.ACTIONS[record[6]], record[8])
+
+    def analyze(self, limit=100):
+        """Counts of shadowed, redundant and overlapping rules, with up to limit findings."""
+        with self.lock:
+            return self.analyzer.report(limit)
+
+    def scan(self, payload):
+        """Ids of the rules whose signature fragment occurs anywhere in payload."""
+        with self.lock:
+            return sorted(self.scanner.scan(payload))
+
+    def scan_batch(self, payloads):
+        """scan() over many payloads in one pass of the lock."""
+        with self.lock:
+            return [sorted(hits) for hits in self.scanner.scan_batch(payloads)]
+
+    def match(self, threat):
+        """Returns the rules already covering a threat, highest priority first."""
+        with self.lock:
+            type_code = TYPE_CODES[threat.type]
+            rows = self.index.match(threat.src, type_code, threat.payload)
+            rules = [self.rules_db.get(row) for row in rows]
+            if self.disk is not None:
+                i = self.disk.find(threat.src, type_code, bytes(threat.payload[:self.SIG_BYTES]))
+                if i >= 0 and self._disk_live(i, time.time()):
+                    rules.append(RuleStore.record_to_rule(self.disk.read(i)))
+                    rules.sort(key=lambda rule: -rule.priority)
+            return rules
+
+    def match_batch(self, threats):
+        """Runs match() over a list of threats."""
+        return [self.match(threat) for threat in threats]
+
+    def lookup_ip(self, ip):
+        """Longest-prefix match of a dotted IP against the aggregated source table."""
+        with self.lock:
+            return self.cidr.lookup(ip_to_int(ip))
+
+    def iter_rules(self):
+        """Yields every live Rule: snapshot rules first, then in-memory ones."""
+        with self.lock:
+            if self.disk is not None:
+                for record in self.disk:
+                    if record[7]:
+                        yield RuleStore.record_to_rule(record)
+            yield from self.rules_db
+
+    def export_page(self, start, limit, type=None, min_priority=None, max_priority=None, since=None,
+                    minimize=False):
+        """
+        Returns up to limit (position, Rule) pairs at or after position start
+        that pass the filters, plus the position to resume from (None once
+        the end is reached). minimize skips rules that never fire because a
+        rule that wins before them covers them. A page may come back short, or even empty,
+        before the end. Positions run over the snapshot and then the
+        in-memory rows, so rules added meanwhile show up at the end. At
+        least one position is always scanned, so repeated calls make progress.
+        """
+        limit = max(limit, 1)
+        type_code = None if type is None else TYPE_CODES[type]
+        low = 0 if min_priority is None else min_priority
+        high = 0xFFFF if max_priority is None else max_priority
+        since = float('-inf') if since is None else since
+
+        def wanted(record):
+            return (record[7] and (type_code is None or record[1] == type_code)
+                    and low <= record[5] <= high and record[8] >= since
+                    and not (analyzer is not None and analyzer.is_covered(self._key(*record[:3]))))
+
+        page = []
+        with self.lock:
+            analyzer = self.analyzer if minimize else None
+            snapshot = 0 if self.disk is None else self.disk.count
+            store = self.rules_db
+            end = snapshot + len(store.alive)
+            pos = start
+            # Bound the scan so a sparse filter can't hold the lock for a full pass
+            stop = min(end, start + limit * 16)
+            while pos < stop and len(page) < limit:
+                if pos < snapshot:
+                    record = self.disk.read(pos)
+                else:
+                    record = store.record(pos - snapshot)
+                if wanted(record):
+                    page.append((pos, RuleStore.record_to_rule(record)))
+                pos += 1
+        return page, (pos if pos < end else None)
+
+    def export_rules_json(self):
+        """Returns the current policy fabric as JSON."""
+        with self.lock:
+            return [rule.to_dict() for rule in self.iter_rules()]
+
+    def export_cidr_rules(self):
+        """Returns the source_ip rules aggregated into a minimal CIDR block list."""
+        with self.lock:
+            return list(self.cidr.export())
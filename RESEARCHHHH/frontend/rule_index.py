@@ -0,0 +1,83 @@
+import bisect
+
+class RuleIndex:
+    """
+    Lookup indexes over the rows of a RuleStore, maintained as rules are added.
+
+    Rows are hashed on the packed source_ip with the type code folded into the
+    key (one bucket per source and type), and kept in priority order (higher
+    value wins). Signature fragments form a prefix trie flattened into one
+    hash keyed by the fragment bytes, so a payload is checked with one probe
+    per signature length in use. A bucket holding a single row stores the
+    bare row number; that is the common case and saves a list per rule.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.by_source = {}
+        self.sig_prefixes = {}
+        self.sig_lengths = []
+
+    def add(self, row):
+        store = self.store
+        key = store.source_ip[row] << 8 | store.type_code[row]
+        bucket = self.by_source.get(key)
+        if bucket is None:
+            self.by_source[key] = row
+        else:
+            if not isinstance(bucket, list):
+                bucket = self.by_source[key] = [bucket]
+            bisect.insort(bucket, row, key=lambda r: -store.priority[r])
+
+        fragment = store.signature_bytes(row)
+        rows = self.sig_prefixes.get(fragment)
+        if rows is None:
+            self.sig_prefixes[fragment] = row
+        elif isinstance(rows, set):
+            rows.add(row)
+        else:
+            self.sig_prefixes[fragment] = {rows, row}
+        if len(fragment) not in self.sig_lengths:
+            bisect.insort(self.sig_lengths, len(fragment))
+
+    def remove(self, row):
+        store = self.store
+        key = store.source_ip[row] << 8 | store.type_code[row]
+        self.by_source[key] = self._discard(self.by_source[key], row)
+        if self.by_source[key] is None:
+            del self.by_source[key]
+
+        fragment = store.signature_bytes(row)
+        self.sig_prefixes[fragment] = self._discard(self.sig_prefixes[fragment], row)
+        if self.sig_prefixes[fragment] is None:
+            del self.sig_prefixes[fragment]
+
+    @staticmethod
+    def _discard(rows, row):
+        # Undoes add(): bare row -> None, collection of two -> bare row
+        if isinstance(rows, int):
+            return None
+        rows.remove(row)
+        if len(rows) == 1:
+            return next(iter(rows))
+        return rows
+
+    def match(self, src, type_code, payload):
+        """Returns the rows covering a threat, highest priority first."""
+        bucket = self.by_source.get(src << 8 | type_code)
+        if bucket is None:
+            return []
+        if not isinstance(bucket, list):
+            bucket = (bucket,)
+
+        hits = []
+        for length in self.sig_lengths:
+            rows = self.sig_prefixes.get(bytes(payload[:length]))
+            if rows is None:
+                continue
+            if isinstance(rows, set):
+                hits.extend(rows)
+            else:
+                hits.append(rows)
+
+        return [row for row in bucket if row in hits]
@@ -0,0 +1,155 @@
+from array import array
+
+from src.cidr_table import int_to_ip
+from src.threat_engine import ThreatEngine
+
+TYPE_CODES = {t_type: code for code, t_type in enumerate(ThreatEngine.THREAT_TYPES)}
+
+class Rule:
+    """A compiled firewall rule. The source IP is a packed 32-bit integer."""
+    __slots__ = ("rule_id", "type", "signature", "source_ip", "action", "priority", "created_at",
+                 "hits", "last_seen")
+
+    def __init__(self, rule_id, type, signature, source_ip, action, priority, created_at,
+                 hits=1, last_seen=None):
+        self.rule_id = rule_id
+        self.type = type
+        self.signature = signature
+        self.source_ip = source_ip
+        self.action = action
+        self.priority = priority
+        self.created_at = created_at
+        self.hits = hits
+        self.last_seen = created_at if last_seen is None else last_seen
+
+    def to_dict(self):
+        """Materializes the rule in the policy fabric JSON layout."""
+        return {
+            "rule_id": self.rule_id,
+            "match": {
+                "type": self.type,
+                "signature": self.signature,
+                "source_ip": int_to_ip(self.source_ip)
+            },
+            "action": self.action,
+            "priority": self.priority,
+            "created_at": self.created_at,
+            "hits": self.hits,
+            "last_seen": self.last_seen
+        }
+
+class RuleStore:
+    """
+    Columnar rule storage. Every field lives in a typed array indexed by row,
+    so a rule costs a few dozen bytes instead of a nest of dicts. Rule records
+    and dicts are only built on read.
+
+    Rule ids are R-XXXX and signatures SIG_<fragment>_XXXX, so both 16-bit
+    tags are stored as integers and the fragment as fixed-width bytes.
+    Deleted rows are only flagged dead; row numbers stay stable.
+    """
+    ACTIONS = ['DROP', 'ALLOW']
+
+    def __init__(self, sig_bytes):
+        self.sig_bytes = sig_bytes
+        self.rule_tag = array('H')
+        self.source_ip = array('I')
+        self.priority = array('H')
+        self.type_code = array('B')
+        self.action_code = array('B')
+        self.sig = bytearray()
+        self.sig_tag = array('H')
+        self.created_at = array('d')
+        self.hits = array('I')
+        self.last_seen = array('d')
+        self.alive = bytearray()
+        self.live = 0
+
+    def __len__(self):
+        return self.live
+
+    def __iter__(self):
+        for row in range(len(self.alive)):
+            if self.alive[row]:
+                yield self.get(row)
+
+    def append(self, rule):
+        """Stores a Rule and returns its row number."""
+        sig_hex, tag = rule.signature[4:].split('_')
+        fragment = bytes.fromhex(sig_hex).ljust(self.sig_bytes, b'\0')
+
+        self.rule_tag.append(int(rule.rule_id[2:], 16))
+        self.source_ip.append(rule.source_ip)
+        self.priority.append(rule.priority)
+        self.type_code.append(TYPE_CODES[rule.type])
+        self.action_code.append(self.ACTIONS.index(rule.action))
+        self.sig += fragment
+        self.sig_tag.append(int(tag, 16))
+        self.created_at.append(rule.created_at)
+        self.hits.append(rule.hits)
+        self.last_seen.append(rule.last_seen)
+        self.alive.append(1)
+        self.live += 1
+        return len(self.alive) - 1
+
+    def append_record(self, record):
+        """Stores a RuleFile record tuple and returns its row number."""
+        (source_ip, type_code, fragment, rule_tag, sig_tag, priority,
+         action_code, alive, created_at, last_seen, hits) = record
+        self.rule_tag.append(rule_tag)
+        self.source_ip.append(source_ip)
+        self.priority.append(priority)
+        self.type_code.append(type_code)
+        self.action_code.append(action_code)
+        self.sig += fragment
+        self.sig_tag.append(sig_tag)
+        self.created_at.append(created_at)
+        self.hits.append(hits)
+        self.last_seen.append(last_seen)
+        self.alive.append(alive)
+        self.live += alive
+        return len(self.alive) - 1
+
+    def record(self, row):
+        """The row as a RuleFile record tuple."""
+        return (self.source_ip[row], self.type_code[row], self.signature_bytes(row),
+                self.rule_tag[row], self.sig_tag[row], self.priority[row],
+                self.action_code[row], self.alive[row], self.created_at[row],
+                self.last_seen[row], self.hits[row])
+
+    def touch(self, row, now):
+        """Records another compile that resolved to this row."""
+        self.hits[row] += 1
+        self.last_seen[row] = now
+
+    def delete(self, row):
+        if self.alive[row]:
+            self.alive[row] = 0
+            self.live -= 1
+
+    def signature_bytes(self, row):
+        return bytes(self.sig[row * self.sig_bytes:(row + 1) * self.sig_bytes])
+
+    def get(self, row):
+        """Builds the Rule record stored at a row."""
+        return self.record_to_rule(self.record(row))
+
+    @classmethod
+    def record_to_rule(cls, record):
+        """Builds a Rule from a RuleFile record tuple."""
+        (source_ip, type_code, fragment, rule_tag, sig_tag, priority,
+         action_code, _, created_at, last_seen, hits) = record
+        return Rule(
+            rule_id=f"R-{rule_tag:04X}",
+            type=ThreatEngine.THREAT_TYPES[type_code],
+            signature=f"SIG_{fragment.hex().upper()}_{sig_tag:04X}",
+            source_ip=source_ip,
+            action=cls.ACTIONS[action_code],
+            priority=priority,
+            created_at=created_at,
+            hits=hits,
+            last_seen=last_seen
+        )
+
+    def to_dicts(self):
+        return [rule.to_dict() for rule in self]
@@ -0,0 +1,159 @@
+from collections import deque
+
+# Patterns added since the last fold are looked up by window; past this many
+# (or 1/FOLD_RATIO of the folded patterns, if more) they are folded into the
+# automaton before the next scan. Scaling with the automaton keeps the
+# rebuild cost per added pattern flat as the rule set grows.
+FOLD_EVERY = 64
+FOLD_RATIO = 4
+
+class SignatureScanner:
+    """
+    Aho-Corasick scanner over rule signature fragments.
+
+    Every live fragment is a pattern mapped to the ids of the rules that
+    carry it, and a payload is scanned in one pass whatever the number of
+    patterns. Failure links can't be patched in place cheaply, so new
+    patterns wait in pending sets, one per pattern length, that a scan
+    probes with every window of the payload; once enough have queued up
+    they are folded into the automaton and its links rebuilt, so a steady
+    trickle of new rules doesn't rebuild the automaton on every scan. Removed patterns
+    stay in the automaton as dead ends until enough pile up to warrant a
+    rebuild from scratch.
+    """
+
+    def __init__(self, fold_every=FOLD_EVERY):
+        self.fold_every = fold_every
+        # pattern -> {rule_id: count}; rule ids are short tags and can repeat
+        self.patterns = {}
+        # pattern length -> patterns not yet in the automaton
+        self.pending = {}
+        self._pending_count = 0
+        self._dead = 0
+        self._reset_automaton()
+
+    def _reset_automaton(self):
+        # Node 0 is the root. goto holds the trie edges, fail the failure
+        # links, term the pattern ending at a node and out the next node
+        # down the failure chain that ends a pattern (0 for none)
+        self.goto = [{}]
+        self.fail = [0]
+        self.term = [None]
+        self.out = [0]
+        self.folded = set()
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def add(self, pattern, rule_id):
+        ids = self.patterns.get(pattern)
+        if ids is None:
+            ids = self.patterns[pattern] = {}
+            if pattern in self.folded:
+                self._dead -= 1
+            else:
+                self.pending.setdefault(len(pattern), set()).add(pattern)
+                self._pending_count += 1
+        ids[rule_id] = ids.get(rule_id, 0) + 1
+
+    def remove(self, pattern, rule_id):
+        ids = self.patterns.get(pattern)
+        if ids is None or rule_id not in ids:
+            return
+        ids[rule_id] -= 1
+        if ids[rule_id]:
+            return
+        del ids[rule_id]
+        if ids:
+            return
+        del self.patterns[pattern]
+        group = self.pending.get(len(pattern))
+        if group is not None and pattern in group:
+            group.discard(pattern)
+            self._pending_count -= 1
+            if not group:
+                del self.pending[len(pattern)]
+        else:
+            self._dead += 1
+
+    def fold(self):
+        """Moves pending patterns into the automaton and rebuilds its failure links."""
+        if self._dead > len(self.patterns):
+            self._reset_automaton()
+            self._dead = 0
+            pending = self.patterns
+        else:
+            pending = [pattern for group in self.pending.values() for pattern in group]
+        for pattern in pending:
+            self._insert(pattern)
+        self.pending = {}
+        self._pending_count = 0
+        self._link()
+
+    def _insert(self, pattern):
+        goto = self.goto
+        node = 0
+        for byte in pattern:
+            child = goto[node].get(byte)
+            if child is None:
+                child = goto[node][byte] = len(goto)
+                goto.append({})
+                self.fail.append(0)
+                self.term.append(None)
+                self.out.append(0)
+            node = child
+        self.term[node] = pattern
+        self.folded.add(pattern)
+
+    def _link(self):
+        goto, fail, term, out = self.goto, self.fail, self.term, self.out
+        queue = deque()
+        for child in goto[0].values():
+            fail[child] = out[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for byte, child in goto[node].items():
+                state = fail[node]
+                while state and byte not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(byte, 0)
+                fail[child] = target
+                out[child] = target if term[target] is not None else out[target]
+                queue.append(child)
+
+    def _fold_due(self):
+        return self._pending_count >= max(self.fold_every, len(self.folded) // FOLD_RATIO)
+
+    def scan(self, payload):
+        """Returns the set of rule ids whose signature fragment occurs anywhere in payload."""
+        if self._fold_due():
+            self.fold()
+        return self._scan(bytes(payload))
+
+    def scan_batch(self, payloads):
+        """scan() over many payloads."""
+        if self._fold_due():
+            self.fold()
+        return [self._scan(bytes(payload)) for payload in payloads]
+
+    def _scan(self, payload):
+        goto, fail, term, out, patterns = self.goto, self.fail, self.term, self.out, self.patterns
+        hits = set()
+        state = 0
+        for byte in payload:
+            while state and byte not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(byte, 0)
+            node = state if term[state] is not None else out[state]
+            while node:
+                ids = patterns.get(term[node])
+                if ids:
+                    hits.update(ids)
+                node = out[node]
+        for length, group in self.pending.items():
+            for i in range(len(payload) - length + 1):
+                window = payload[i:i + length]
+                if window in group:
+                    hits.update(patterns[window])
+        return hits
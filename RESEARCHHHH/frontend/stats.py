@@ -0,0 +1,106 @@
+import heapq
+import threading
+import time
+
+from src.cidr_table import int_to_ip
+from src.rule_store import TYPE_CODES
+
+class DashboardStats:
+    """
+    Rolling aggregates for the dashboard charts, kept in a ring of time
+    buckets and updated as threats are collected and killed (compiled into
+    rules), so a read costs O(buckets), not O(threats).
+
+    Each bucket holds the kill count per threat type, the collected count
+    and collected threats per source /16. Window totals are kept alongside
+    and adjusted as buckets fall out of the ring.
+    """
+
+    def __init__(self, bucket_seconds=15.0, buckets=40, clock=time.time):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.kills = [[0] * len(TYPE_CODES) for _ in range(buckets)]
+        self.collected = [0] * buckets
+        self.heat = [{} for _ in range(buckets)]
+        self.window_kills = [0] * len(TYPE_CODES)
+        self.window_heat = {}
+        self.total_kills = 0
+        self.total_collected = 0
+        # Absolute number of the newest bucket
+        self.head = int(clock() // bucket_seconds)
+
+    def _advance(self, now):
+        # Clears the slots of every bucket that has fallen out of the window
+        current = int(now // self.bucket_seconds)
+        if current <= self.head:
+            return
+        for bucket in range(max(self.head + 1, current - self.buckets + 1), current + 1):
+            slot = bucket % self.buckets
+            kills = self.kills[slot]
+            for code, count in enumerate(kills):
+                self.window_kills[code] -= count
+                kills[code] = 0
+            for prefix, count in self.heat[slot].items():
+                left = self.window_heat[prefix] - count
+                if left:
+                    self.window_heat[prefix] = left
+                else:
+                    del self.window_heat[prefix]
+            self.heat[slot] = {}
+            self.collected[slot] = 0
+        self.head = current
+
+    def record_collected(self, threats):
+        with self.lock:
+            self._advance(self.clock())
+            slot = self.head % self.buckets
+            heat = self.heat[slot]
+            window_heat = self.window_heat
+            count = 0
+            for threat in threats:
+                prefix = threat.src >> 16
+                heat[prefix] = heat.get(prefix, 0) + 1
+                window_heat[prefix] = window_heat.get(prefix, 0) + 1
+                count += 1
+            self.collected[slot] += count
+            self.total_collected += count
+
+    def record_kills(self, threats):
+        with self.lock:
+            self._advance(self.clock())
+            kills = self.kills[self.head % self.buckets]
+            count = 0
+            for threat in threats:
+                code = TYPE_CODES[threat.type]
+                kills[code] += 1
+                self.window_kills[code] += 1
+                count += 1
+            self.total_kills += count
+
+    def snapshot(self, heat_rows=8):
+        """
+        The window as compact arrays, oldest bucket first: per-type kills,
+        the kill and collection timeline, and the heat matrix for the
+        heat_rows busiest source /16s.
+        """
+        with self.lock:
+            self._advance(self.clock())
+            order = [(self.head - age) % self.buckets for age in range(self.buckets - 1, -1, -1)]
+            top = heapq.nlargest(heat_rows, self.window_heat.items(), key=lambda item: item[1])
+            return {
+                "bucket_seconds": self.bucket_seconds,
+                "start": (self.head - self.buckets + 1) * self.bucket_seconds,
+                "types": list(TYPE_CODES),
+                "kills_by_type": list(self.window_kills),
+                "totals": {"kills": self.total_kills, "collected": self.total_collected},
+                "timeline": {
+                    "kills": [sum(self.kills[slot]) for slot in order],
+                    "collected": [self.collected[slot] for slot in order],
+                },
+                "heat": {
+                    "prefixes": [f"{int_to_ip(prefix << 16)}/16" for prefix, _ in top],
+                    "cells": [[self.heat[slot].get(prefix, 0) for slot in order] for prefix, _ in top],
+                },
+            }